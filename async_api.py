@@ -0,0 +1,146 @@
+"""asyncio facade over the models for services that serve many stations.
+
+    tracker = AsyncTracker()
+    product = await tracker.Product.get_product(12)
+    await tracker.Product.move_product(12, 3)
+    await tracker.close()
+
+Reads run on a pool of threads whose pooled connections have PRAGMA
+query_only set, so a read can never take the write lock. WAL journaling
+lets them run alongside the writer. Every write goes through one writer
+thread, in submission order, so two stations never contend for the lock
+and SQLite never answers "database is locked". Archive-tier reads
+(include_archived=True) also use the writer, because attaching the
+archive may create its tables.
+
+Back-pressure: at most `max_pending_reads` reads and `max_pending_writes`
+writes are queued or running at once. Further calls wait (asynchronously)
+for a slot instead of growing the queue without bound. Wrap a call in
+asyncio.wait_for() to give up after a deadline.
+
+Cancellation: cancelling a call that is still waiting for a slot, or
+still queued for its thread, withdraws it and it never runs. Once a call
+has started on its thread it cannot be interrupted. A cancelled write that
+has started still commits, and only its result is discarded. A write
+either fully commits or fully rolls back, never half-applies.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from models.change_feed import ChangeFeed
+from models.client import Client
+from models.department import Department
+from models.movement import Movement
+from models.product import Product
+from models.team_leader import TeamLeader
+
+# Methods exposed per model, split by which thread they may run on.
+READS = {
+    Product: ("get_product", "get_products_page", "get_all_products", "get_product_history",
+              "search", "find_by_name"),
+    Department: ("get_all_departments", "get_sequence"),
+    TeamLeader: ("get_all_team_leaders", "get_leaders_by_department", "get_leader_for_department"),
+    Movement: ("get_history",),
+    Client: ("get_summary", "verify_summary"),
+    ChangeFeed: ("get_cursor", "get_changes"),
+}
+WRITES = {
+    Product: ("add_product", "add_products_bulk", "move_product", "move_products_bulk",
+              "delete_product", "mark_completed"),
+    Department: ("add_department", "delete_department"),
+    TeamLeader: ("add_team_leader", "delete_team_leader"),
+    Movement: ("move_product",),
+    Client: ("rebuild_summary",),
+}
+
+
+class _ModelProxy:
+    """Async versions of one model's methods, e.g. tracker.Product."""
+
+    def __init__(self, tracker, model):
+        self._tracker = tracker
+        self._model = model
+
+    def __getattr__(self, name):
+        if name in READS.get(self._model, ()):
+            call = self._tracker.read
+        elif name in WRITES.get(self._model, ()):
+            call = self._tracker.write
+        else:
+            raise AttributeError(f"{self._model.__name__}.{name} is not available asynchronously")
+        return functools.partial(call, getattr(self._model, name))
+
+
+class AsyncTracker:
+    """Run model calls off the event loop: pooled readers, one writer."""
+
+    def __init__(self, readers=4, max_pending_reads=256, max_pending_writes=64):
+        self._reader_count = readers
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix="tracker-read",
+                                           initializer=self._init_reader)
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="tracker-write")
+        self._read_slots = asyncio.Semaphore(max_pending_reads)
+        self._write_slots = asyncio.Semaphore(max_pending_writes)
+        self._closed = False
+        for model in READS.keys() | WRITES.keys():
+            setattr(self, model.__name__, _ModelProxy(self, model))
+
+    @staticmethod
+    def _init_reader():
+        database.get_connection().execute("PRAGMA query_only = ON")
+
+    async def read(self, func, *args, **kwargs):
+        """Run a read-only model call on the reader pool."""
+        if kwargs.get("include_archived"):
+            return await self.write(func, *args, **kwargs)
+        return await self._submit(self._readers, self._read_slots, func, args, kwargs)
+
+    async def write(self, func, *args, **kwargs):
+        """Run a model call on the writer thread, after all earlier writes."""
+        return await self._submit(self._writer, self._write_slots, func, args, kwargs)
+
+    async def _submit(self, executor, slots, func, args, kwargs):
+        if self._closed:
+            raise RuntimeError("AsyncTracker is closed")
+        await slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = executor.submit(func, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        # Free the slot when the call really finishes (or is withdrawn),
+        # not when a cancelled caller stops waiting for it.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(slots.release))
+        return await asyncio.wrap_future(future)
+
+    async def close(self):
+        """Finish queued calls, then close the worker threads' connections."""
+        if self._closed:
+            return
+        self._closed = True
+        await asyncio.to_thread(self._shutdown)
+
+    def _shutdown(self):
+        # Every reader thread takes exactly one of these, so each closes
+        # its own pooled connection before the pool goes away.
+        barrier = threading.Barrier(self._reader_count)
+
+        def close_reader():
+            barrier.wait(timeout=10)
+            database.close_connection()
+
+        for _ in range(self._reader_count):
+            self._readers.submit(close_reader)
+        self._writer.submit(database.close_connection)
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
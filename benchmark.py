@@ -0,0 +1,258 @@
+"""Benchmark the model layer and CLI reports at several database sizes.
+
+Each scale gets a synthetic database from datagen.py, built once and kept
+under bench_data/ so later runs skip generation. Every run works on a fresh
+copy of it, so write operations never skew the next run. Each operation is
+timed several times and the median is recorded.
+
+    python benchmark.py --scales 10000,100000 --out results.json
+    python benchmark.py --baseline results.json     # exits 1 on regressions
+
+It also measures scan ingestion: commit-per-event Product.move_product
+against the group-commit MovementQueue.
+
+A regression is an operation whose median is more than --tolerance slower
+than the baseline's (and by more than a millisecond, to ignore noise on
+sub-millisecond calls).
+"""
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import redirect_stdout, redirect_stderr
+from datetime import datetime, timedelta
+
+import click
+from click.testing import CliRunner
+
+import database
+import datagen
+
+DATA_DIR = "bench_data"
+SEED = 42
+
+
+def _dataset(scale):
+    """Path of the generated database for `scale`, building it if needed."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"bench_{scale}_{SEED}.db")
+    if not os.path.exists(path):
+        click.echo(f"Generating {scale} products...", err=True)
+        datagen.generate(path, products=scale, seed=SEED)
+    return path
+
+
+def _cli(*args):
+    """Run a commands.py invocation in-process against the current database."""
+    import commands
+
+    result = CliRunner().invoke(commands.main, ["--db", database.DB_NAME, *args])
+    if result.exit_code != 0:
+        raise RuntimeError(f"{' '.join(args)} failed: {result.output}")
+
+
+def _operations(scale):
+    """Return (name, callable) pairs; ids are picked from the generated range."""
+    from models.analytics import Analytics
+    from models.client import Client
+    from models.department import Department
+    from models.product import Product
+    from models.snapshot import Snapshot
+
+    mid = scale // 2
+    middle_of_period = (datetime.now() - timedelta(days=180)).date().isoformat()
+    first_department = Department.get_sequence().first[0]
+    counter = iter(range(1, 1_000_000))
+
+    def add_and_delete_department():
+        name = f"Bench {next(counter)}"
+        Department.add_department(name, "Fabrication")
+        Department.delete_department(name)
+
+    return [
+        ("Product.get_all_products", Product.get_all_products),
+        ("Product.get_products_page", lambda: Product.get_products_page(after_id=mid, limit=50)),
+        ("Product.get_products_page[client]",
+         lambda: Product.get_products_page(limit=50, client="Client 001")),
+        ("Product.get_product", lambda: Product.get_product(mid)),
+        ("Product.search", lambda: Product.search(f"pan {mid // 100}")),
+        ("Product.get_product_history", lambda: Product.get_product_history(mid)),
+        ("Product.move_product", lambda: Product.move_product(mid, first_department)),
+        ("Product.move_products_bulk[100]",
+         lambda: Product.move_products_bulk(product_ids=range(mid, mid + 100))),
+        ("Department.add_department+delete", add_and_delete_department),
+        ("Client.get_summary", Client.get_summary),
+        ("Client.verify_summary", Client.verify_summary),
+        ("Analytics.refresh[full]", lambda: Analytics.refresh(full=True)),
+        ("Analytics.refresh[incremental]", Analytics.refresh),
+        ("Analytics.get_dwell_times", Analytics.get_dwell_times),
+        ("Analytics.get_daily_throughput", Analytics.get_daily_throughput),
+        ("Analytics.get_bottleneck", Analytics.get_bottleneck),
+        ("Analytics.forecast_deadlines", Analytics.forecast_deadlines),
+        ("Snapshot.wip_at", lambda: Snapshot.wip_at(middle_of_period)),
+        ("cli: products list --limit 50", lambda: _cli("products", "list", "--limit", "50")),
+        ("cli: summary", lambda: _cli("summary")),
+        ("cli: analytics dwell", lambda: _cli("analytics", "dwell")),
+        ("cli: wip", lambda: _cli("wip", middle_of_period)),
+    ]
+
+
+def _time(fn, repeat):
+    """Median and minimum wall time of `fn` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "runs": repeat}
+
+
+def run_scale(scale, repeat):
+    """Time every operation against a fresh copy of the `scale` dataset."""
+    work = os.path.join(DATA_DIR, f"work_{scale}.db")
+    shutil.copyfile(_dataset(scale), work)
+    original_db = database.DB_NAME
+    database.DB_NAME = work
+    try:
+        results = {}
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            database.ensure_schema()
+            for name, fn in _operations(scale):
+                results[name] = _time(fn, repeat)
+        return results
+    finally:
+        database.close_connection()
+        database.DB_NAME = original_db
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(work + suffix):
+                os.remove(work + suffix)
+
+
+def run_ingest(scale, events, stations=16):
+    """Scans per second with commit-per-event versus MovementQueue group commit.
+
+    `stations` threads each scan events/stations products, waiting for each
+    scan to be acknowledged before the next, like a floor of scanners.
+    """
+    from models.product import Product
+    from movement_queue import MovementQueue
+
+    work = os.path.join(DATA_DIR, f"work_{scale}.db")
+    shutil.copyfile(_dataset(scale), work)
+    original_db = database.DB_NAME
+    database.DB_NAME = work
+    per_station = events // stations
+
+    def timed_stations(scan):
+        def station(n):
+            for i in range(per_station):
+                scan(1 + (n * per_station + i) % scale, 1 + i % 4)
+            database.close_connection()
+
+        threads = [threading.Thread(target=station, args=(n,)) for n in range(stations)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return round(per_station * stations / (time.perf_counter() - start))
+
+    try:
+        with redirect_stdout(io.StringIO()):
+            database.ensure_schema()
+        results = {"commit_per_event_eps": timed_stations(Product.move_product)}
+        scans = MovementQueue(spool=work + ".spool")
+        results["group_commit_eps"] = timed_stations(scans.move)
+
+        start = time.perf_counter()
+        acks = [scans.submit(1 + i % scale, 1 + i % 4) for i in range(events)]
+        for ack in acks:
+            ack.result()
+        results["group_commit_burst_eps"] = round(events / (time.perf_counter() - start))
+        scans.close()
+        return results
+    finally:
+        database.close_connection()
+        database.DB_NAME = original_db
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(work + suffix):
+                os.remove(work + suffix)
+
+
+def compare(results, baseline, tolerance):
+    """Return (scale, operation, baseline ms, current ms) for each regression."""
+    regressions = []
+    for scale, operations in results["results"].items():
+        for name, current in operations.items():
+            before = baseline.get("results", {}).get(scale, {}).get(name)
+            if not before:
+                continue
+            slower = current["median_ms"] - before["median_ms"]
+            if slower > 1 and current["median_ms"] > before["median_ms"] * (1 + tolerance):
+                regressions.append((scale, name, before["median_ms"], current["median_ms"]))
+    return regressions
+
+
+@click.command()
+@click.option("--scales", default="10000,100000,1000000", show_default=True,
+              help="Comma-separated product counts.")
+@click.option("--repeat", default=5, show_default=True, help="Timed runs per operation.")
+@click.option("--out", default="bench_results.json", show_default=True, help="Where to write results.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False),
+              help="Earlier results to compare against.")
+@click.option("--tolerance", default=0.25, show_default=True,
+              help="Allowed slowdown before a result counts as a regression.")
+@click.option("--ingest-events", default=4000, show_default=True,
+              help="Scans for the commit-per-event vs group-commit comparison (0 skips it).")
+def main(scales, repeat, out, baseline, tolerance, ingest_events):
+    """Run the benchmark suite."""
+    from tabulate import tabulate
+
+    results = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "seed": SEED,
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    scale_list = [int(s) for s in scales.split(",")]
+    for scale in scale_list:
+        click.echo(f"Benchmarking {scale} products...", err=True)
+        results["results"][str(scale)] = run_scale(scale, repeat)
+    if ingest_events:
+        click.echo(f"Ingesting {ingest_events} scans...", err=True)
+        results["ingest"] = run_ingest(scale_list[0], ingest_events)
+
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    rows = [(scale, name, r["median_ms"], r["min_ms"])
+            for scale, operations in results["results"].items()
+            for name, r in operations.items()]
+    click.echo(tabulate(rows, headers=["scale", "operation", "median ms", "min ms"]))
+    if "ingest" in results:
+        click.echo("\n" + tabulate(results["ingest"].items(), headers=["ingest mode", "scans/sec"]))
+    click.echo(f"\nResults written to {out}.")
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        if regressions:
+            click.echo("\n❌ Regressions against the baseline:")
+            click.echo(tabulate(regressions, headers=["scale", "operation", "baseline ms", "now ms"]))
+            raise SystemExit(1)
+        click.echo("\n✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Check AsyncTracker's cancellation, back-pressure and shutdown behaviour.
+
+    python check_async.py
+
+Runs each promise made in async_api.py's docstring against a scratch
+database, using writes that block on an event so the test controls when
+the writer thread is busy:
+
+- a call cancelled while waiting for a slot, or while queued for its
+  thread, never runs;
+- a call cancelled after it started still commits, and its slot is freed;
+- with max_pending_writes in flight, further calls wait until one finishes;
+- close() lets queued calls finish before the threads stop.
+
+Exits 1 if any check fails.
+"""
+import asyncio
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+import database
+
+SETTLE = 0.2   # seconds to let tasks reach the point they are expected to block at
+
+
+class Blocker:
+    """A write that holds the writer thread until released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        self.release.wait(10)
+
+    async def wait_started(self):
+        await asyncio.to_thread(self.started.wait, 10)
+
+
+async def cancelled_waiter_never_runs(tracker_factory):
+    """Cancelled while waiting for a slot, and while queued on the writer thread."""
+    ran = []
+    async with tracker_factory(max_pending_writes=2) as tracker:
+        blocker = Blocker()
+        busy = asyncio.create_task(tracker.write(blocker))
+        await blocker.wait_started()
+        queued = asyncio.create_task(tracker.write(ran.append, "queued"))
+        waiting = asyncio.create_task(tracker.write(ran.append, "waiting"))
+        await asyncio.sleep(SETTLE)
+        queued.cancel()
+        waiting.cancel()
+        # The withdrawal reaches the thread pool on the loop's next turn
+        await asyncio.sleep(SETTLE)
+        blocker.release.set()
+        await busy
+        await tracker.write(ran.append, "after")
+    return ran == ["after"], f"calls that ran: {ran}"
+
+
+async def cancelled_running_call_commits(tracker_factory):
+    """A write cancelled mid-call still commits, and its slot comes back."""
+    from models.product import Product
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_add():
+        started.set()
+        release.wait(10)
+        return Product.add_product("Cancelled Panel", "Acme", "2030-01-01", 1)
+
+    async with tracker_factory(max_pending_writes=1) as tracker:
+        task = asyncio.create_task(tracker.write(slow_add))
+        await asyncio.to_thread(started.wait, 10)
+        task.cancel()
+        release.set()
+        # Only passes if the cancelled call gave its one slot back
+        matches = await asyncio.wait_for(tracker.write(Product.find_by_name, "Cancelled Panel"), 5)
+    return len(matches) == 1, f"{len(matches)} product(s) committed by the cancelled call"
+
+
+async def backpressure_blocks_extra_calls(tracker_factory):
+    """Calls beyond max_pending_writes wait for a slot instead of queuing."""
+    limit = 3
+    async with tracker_factory(max_pending_writes=limit) as tracker:
+        blocker = Blocker()
+        tasks = [asyncio.create_task(tracker.write(blocker))]
+        await blocker.wait_started()
+        tasks += [asyncio.create_task(tracker.write(lambda: None)) for _ in range(limit + 2)]
+        await asyncio.sleep(SETTLE)
+        # One call running, limit - 1 queued on the thread, the rest held back
+        queued = tracker._writer._work_queue.qsize()
+        pending = sum(not t.done() for t in tasks)
+        blocker.release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+    ok = queued == limit - 1 and pending == len(tasks)
+    return ok, f"{queued} call(s) queued on the writer thread with a limit of {limit}"
+
+
+async def close_drains_queued_calls(tracker_factory):
+    """close() waits for calls already queued, and rejects new ones."""
+    ran = []
+    tracker = tracker_factory(max_pending_writes=10)
+    blocker = Blocker()
+    tasks = [asyncio.create_task(tracker.write(blocker))]
+    await blocker.wait_started()
+    tasks += [asyncio.create_task(tracker.write(ran.append, n)) for n in range(5)]
+    await asyncio.sleep(SETTLE)
+
+    closing = asyncio.create_task(tracker.close())
+    await asyncio.sleep(SETTLE)
+    blocker.release.set()
+    await asyncio.wait_for(closing, 10)
+    await asyncio.gather(*tasks)
+    try:
+        await tracker.write(ran.append, "late")
+        rejected = False
+    except RuntimeError:
+        rejected = True
+    return ran == list(range(5)) and rejected, f"ran {ran}, later call rejected: {rejected}"
+
+
+CHECKS = [
+    cancelled_waiter_never_runs,
+    cancelled_running_call_commits,
+    backpressure_blocks_extra_calls,
+    close_drains_queued_calls,
+]
+
+
+async def run_checks():
+    """Run every check; returns (name, passed, detail) for each."""
+    from async_api import AsyncTracker
+
+    def tracker_factory(**kwargs):
+        return AsyncTracker(readers=2, **kwargs)
+
+    results = []
+    for check in CHECKS:
+        passed, detail = await asyncio.wait_for(check(tracker_factory), 30)
+        results.append((check.__name__, passed, detail))
+    return results
+
+
+def main():
+    work = tempfile.mkdtemp(prefix="check_async_")
+    original_db = database.DB_NAME
+    database.DB_NAME = os.path.join(work, "async.db")
+    try:
+        with redirect_stdout(io.StringIO()):
+            database.ensure_schema()
+            results = asyncio.run(run_checks())
+    finally:
+        database.close_connection()
+        database.DB_NAME = original_db
+        shutil.rmtree(work, ignore_errors=True)
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    if not all(passed for _, passed, _ in results):
+        sys.exit(1)
+    print("\n✅ Cancellation, back-pressure and shutdown behave as documented.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Check that the sqlite and sqlalchemy backends return the same results.
+
+    python check_backends.py
+
+Runs one script of repository calls (adds, imports, moves, compare-and-swap
+conflicts, completion, deletes, departments, team leaders, summaries and
+archived reads) against a fresh SQLite database per backend, then compares
+every return value. Movement timestamps differ between runs, so histories
+are compared by department only. Exits 1 on any difference.
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+import database
+
+
+def _departments_only(history):
+    return [name for name, _ in history]
+
+
+def _script():
+    """(label, call) pairs; each call takes the repository and returns comparable data."""
+    from models.archive import Archive
+
+    return [
+        ("add_department", lambda r: r.add_department("Quality", "Dispatch")),
+        ("get_all_departments", lambda r: r.get_all_departments()),
+        ("get_sequence", lambda r: r.get_sequence().rows),
+        ("add_product", lambda r: r.add_product("Panel 1", "Acme", "2030-01-01", 1)),
+        ("add_product(client spacing)", lambda r: r.add_product("Panel 2", "  acme ", "2030-02-01", 1)),
+        ("add_product(bad date)", lambda r: r.add_product("Panel 3", "Acme", "soon", 1)),
+        ("add_products_bulk", lambda r: r.add_products_bulk([
+            {"name": f"Unit {i}", "client": f"Client {i % 3}", "completion_date": "2030-03-01"}
+            for i in range(12)
+        ] + [{"name": "Bad", "client": "Acme"}, {"name": "Odd", "client": "Acme",
+                                                "completion_date": "2030-01-01", "department": "Nope"}])),
+        ("get_product", lambda r: r.get_product(2)),
+        ("get_product(missing)", lambda r: r.get_product(999)),
+        ("get_all_products", lambda r: r.get_all_products()),
+        ("get_products_page", lambda r: r.get_products_page(after_id=3, limit=5)),
+        ("get_products_page(client)", lambda r: r.get_products_page(limit=50, client="client 1")),
+        ("iter_products", lambda r: list(r.iter_products(department_id=1, page_size=4))),
+        ("search", lambda r: r.search("uni 1")),
+        ("move_product", lambda r: r.move_product(1, 2)),
+        ("move_product(expected)", lambda r: r.move_product(1, 3, expected_department_id=2)),
+        ("move_product(conflict)", lambda r: r.move_product(1, 4, expected_department_id=2)),
+        ("move_products_bulk(ids)", lambda r: r.move_products_bulk(product_ids=[1, 2, 3])),
+        ("move_products_bulk(dept)", lambda r: r.move_products_bulk(department_id=1)),
+        ("mark_completed(conflict)", lambda r: r.mark_completed(1, expected_department_id=1)),
+        ("mark_completed(expected)", lambda r: r.mark_completed(1, expected_department_id=5)),
+        ("mark_completed", lambda r: r.mark_completed(2)),
+        ("get_product_history", lambda r: _departments_only(r.get_product_history(1))),
+        ("get_products_page(status)", lambda r: r.get_products_page(limit=50, status="Completed")),
+        ("delete_product", lambda r: r.delete_product(5)),
+        ("delete_product(missing)", lambda r: r.delete_product(5)),
+        ("add_department(at the end)", lambda r: r.add_department("Paint", "")),
+        ("add_team_leader", lambda r: r.add_team_leader("Amina", 6)),
+        ("add_team_leader(taken)", lambda r: r.add_team_leader("Bob", 6)),
+        ("add_team_leader(second)", lambda r: r.add_team_leader("Bob", 5)),
+        ("get_leader_for_department", lambda r: r.get_leader_for_department(6)),
+        ("delete_department(in use)", lambda r: r.delete_department("Fabrication")),
+        ("delete_department", lambda r: r.delete_department("Paint")),
+        ("delete_department(missing)", lambda r: r.delete_department("Paint")),
+        ("get_all_team_leaders", lambda r: r.get_all_team_leaders()),
+        ("delete_team_leader", lambda r: r.delete_team_leader("Bob")),
+        ("get_summary", lambda r: r.get_summary()),
+        ("archive", lambda r: Archive.archive_completed("2999-01-01")),
+        ("get_summary(archived)", lambda r: r.get_summary(include_archived=True)),
+        ("get_product_history(archived)",
+         lambda r: _departments_only(r.get_product_history(1, include_archived=True))),
+        ("get_product(archived)", lambda r: r.get_product(1)),
+    ]
+
+
+def _run(backend, path):
+    """Run the script on a new database at `path`; returns [(label, result)]."""
+    from repositories.sqlalchemy_core import CoreRepository
+    from repositories.sqlite_models import SqliteRepository
+
+    database.DB_NAME = path
+    with redirect_stdout(io.StringIO()):
+        database.ensure_schema()
+    repo = SqliteRepository() if backend == "sqlite" else CoreRepository(f"sqlite:///{path}")
+    results = []
+    try:
+        for label, call in _script():
+            with redirect_stdout(io.StringIO()):
+                try:
+                    result = call(repo)
+                except Exception as e:
+                    result = f"{type(e).__name__}: {e}"
+            results.append((label, result))
+    finally:
+        if backend != "sqlite":
+            repo.dispose()
+        database.close_connection()
+    return results
+
+
+def _archive_needs_same_file(work):
+    """The sqlalchemy backend on another file must refuse archived reads with ValueError."""
+    from repositories.sqlalchemy_core import CoreRepository
+
+    repo = CoreRepository(f"sqlite:///{os.path.join(work, 'sqlite.db')}")
+    database.DB_NAME = os.path.join(work, "elsewhere.db")
+    try:
+        repo.get_summary(include_archived=True)
+        return False
+    except ValueError:
+        return True
+    finally:
+        repo.dispose()
+        database.close_connection()
+
+
+def main():
+    work = tempfile.mkdtemp(prefix="check_backends_")
+    original_db = database.DB_NAME
+    try:
+        expected = _run("sqlite", os.path.join(work, "sqlite.db"))
+        actual = _run("sqlalchemy", os.path.join(work, "sqlalchemy.db"))
+        refuses_other_file = _archive_needs_same_file(work)
+    finally:
+        database.DB_NAME = original_db
+        shutil.rmtree(work, ignore_errors=True)
+
+    failures = 0
+    for (label, want), (_, got) in zip(expected, actual):
+        if want == got:
+            print(f"✅ {label}")
+        else:
+            failures += 1
+            print(f"❌ {label}\n      sqlite:     {want!r}\n      sqlalchemy: {got!r}")
+    if not refuses_other_file:
+        failures += 1
+        print("❌ sqlalchemy on another file did not refuse include_archived with ValueError")
+    if failures:
+        print(f"\n❌ {failures} call(s) differ between the backends.")
+        sys.exit(1)
+    print("\n✅ Both backends return the same results.")
+
+
+if __name__ == "__main__":
+    main()
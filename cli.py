@@ -1,10 +1,16 @@
 import os
-import sqlite3
-from database import init_db
+from datetime import datetime, timedelta
+import database
+from database import init_db, ensure_schema
 from models.department import Department
 from models.team_leader import TeamLeader
 from models.product import Product
-from models.movement import Movement
+from models.client import Client
+from models.archive import Archive
+from models.analytics import Analytics
+from models.snapshot import Snapshot
+from models.maintenance import Maintenance
+from models.change_feed import ChangeFeed
 
 
 def clear_screen():
@@ -13,7 +19,9 @@ def clear_screen():
 
 def menu():
     """Main interactive CLI menu"""
-    init_db()
+    if os.environ.get("MANUFACTURING_INSTRUMENT"):
+        database.enable_instrumentation()
+    ensure_schema()
     while True:
         print("\n🏭 MANUFACTURING TRACKING SYSTEM")
         print("--------------------------------")
@@ -29,9 +37,17 @@ def menu():
         print("10. Initialize Database")
         print("11. View Departments")
         print("12. Delete Department")
+        print("13. Import Products from File")
+        print("14. Batch Move Products")
+        print("15. Verify Client Summary")
+        print("16. Archive Completed Products")
+        print("17. Department Analytics Report")
+        print("18. Work-in-Progress at a Point in Time")
+        print("19. Query Statistics")
+        print("20. Database Maintenance")
         print("0. Exit")
 
-        choice = input("\nEnter your choice (0-12): ").strip()
+        choice = input("\nEnter your choice (0-20): ").strip()
 
         if choice == "1":
             add_department()
@@ -58,11 +74,27 @@ def menu():
             view_departments()
         elif choice == "12":
             delete_department()
+        elif choice == "13":
+            import_products()
+        elif choice == "14":
+            batch_move_products()
+        elif choice == "15":
+            verify_client_summary()
+        elif choice == "16":
+            archive_products()
+        elif choice == "17":
+            view_analytics()
+        elif choice == "18":
+            view_wip_snapshot()
+        elif choice == "19":
+            view_query_stats()
+        elif choice == "20":
+            run_maintenance()
         elif choice == "0":
             print("👋 Exiting system. Goodbye!")
             break
         else:
-            print("❌ Invalid choice. Please select between 0-12.")
+            print("❌ Invalid choice. Please select between 0-20.")
 
 
 # --------------------- DEPARTMENT -----------------------
@@ -92,7 +124,8 @@ def view_departments():
     print("\n🏢 Departments (in order):")
     departments = Department.get_all_departments()
     for d in departments:
-        print(f" {d[0]}. {d[1]}")
+        leader = TeamLeader.get_leader_for_department(d[0])
+        print(f" {d[0]}. {d[1]}" + (f" (Leader: {leader[1]})" if leader else ""))
 
 
 def delete_department():
@@ -102,10 +135,10 @@ def delete_department():
     for d in departments:
         print(f" - {d[1]}")
     name = input("Enter department name to delete: ").strip()
-    if Department.delete_department(name):
-        print(f"✅ Department '{name}' deleted successfully.")
-    else:
+    if name not in Department.get_sequence().by_name:
         print("❌ Department not found.")
+    elif Department.delete_department(name):
+        print(f"✅ Department '{name}' deleted successfully.")
 
 
 # --------------------- TEAM LEADER -----------------------
@@ -161,16 +194,72 @@ def delete_team_leader():
 
 # --------------------- PRODUCT -----------------------
 
+PAGE_SIZE = 20
+SEARCH_LIMIT = 15
+
+
+def _browse_products(show, **filters):
+    """Print matching products a page at a time; return how many were shown."""
+    shown = 0
+    after_id = 0
+    while True:
+        page = Product.get_products_page(after_id, PAGE_SIZE, **filters)
+        for p in page:
+            print(show(p))
+        shown += len(page)
+        if len(page) < PAGE_SIZE:
+            return shown
+        if input("-- Enter for more, q to stop -- ").strip().lower() == "q":
+            return shown
+        after_id = page[-1][0]
+
+
+def _choose_product(prompt, show):
+    """Ask for a product ID or search words (blank to browse) and look it up."""
+    answer = input(f"{prompt} or search by name/client (Enter to browse): ").strip()
+    if not answer:
+        print("\n📦 Products:")
+        if not _browse_products(show):
+            print("⚠️ No products found.")
+            return None
+        answer = input(f"{prompt}: ").strip()
+
+    if not answer.isdecimal():
+        return _pick_from_search(answer, prompt, show)
+    return _get_product(answer)
+
+
+def _pick_from_search(text, prompt, show):
+    """Search products; pick the only match or ask for the ID of one."""
+    matches = Product.search(text, limit=SEARCH_LIMIT)
+    if not matches:
+        print("❌ No matching products.")
+        return None
+    if len(matches) == 1:
+        print(f"🔎 {show(matches[0])}")
+        return matches[0]
+    print(f"\n🔎 Matches (newest first, up to {SEARCH_LIMIT}):")
+    for p in matches:
+        print(show(p))
+    return _get_product(input(f"{prompt}: ").strip())
+
+
+def _get_product(answer):
+    """Look up the product whose ID was typed."""
+    try:
+        pid = int(answer)
+    except ValueError:
+        print("❌ Invalid input.")
+        return None
+
+    product = Product.get_product(pid)
+    if not product:
+        print("❌ Product not found.")
+    return product
+
+
 def add_product():
     """Add a new product."""
-    print("\n📦 Existing Products:")
-    products = Product.get_all_products()
-    if not products:
-        print("   No products found yet.")
-    else:
-        for p in products:
-            print(f" - {p[1]} ({p[2]}) [{p[4] if p[4] else 'No department'}]")
-
     client = input("Enter client name: ").strip()
     name = input("Enter product name: ").strip()
     deadline = input("Enter completion timeline (e.g. 2025-12-31): ").strip()
@@ -185,89 +274,143 @@ def add_product():
         print("❌ Failed to add product.")
 
 
-def move_product():
-    """Move product through department flow."""
-    products = Product.get_all_products()
-    if not products:
-        print("\n⚠️ No products found.")
+def import_products():
+    """Bulk-import products from a CSV or JSONL file."""
+    path = input("Enter path to .csv or .jsonl file: ").strip()
+    if not os.path.isfile(path):
+        print("❌ File not found.")
         return
 
-    print("\n📦 Products:")
-    for p in products:
-        print(f"{p[0]}. {p[1]} - {p[4]} (Status: {p[5]})")
+    added, errors = Product.add_products_bulk(Product.read_import_file(path))
+    print(f"✅ Imported {added} product(s).")
+    if errors:
+        print(f"⚠️ Skipped {len(errors)} invalid row(s):")
+        for row_no, message in errors[:20]:
+            print(f"   Row {row_no}: {message}")
+        if len(errors) > 20:
+            print(f"   ... and {len(errors) - 20} more.")
 
-    try:
-        pid = int(input("Enter Product ID to move: "))
-    except ValueError:
-        print("❌ Invalid input.")
+
+def move_product():
+    """Move product through department flow."""
+    product = _choose_product("Enter Product ID to move",
+                              lambda p: f"{p[0]}. {p[1]} - {p[4]} (Status: {p[5]})")
+    if not product:
         return
 
-    departments = Department.get_all_departments()
-    current_dept = None
-    for p in products:
-        if p[0] == pid:
-            current_dept = p[4]
-            break
+    pid = product[0]
+    sequence = Department.get_sequence()
+    current_dept = product[4]
 
     if not current_dept:
         print("❌ Product not found.")
         return
 
-    dept_names = [d[1] for d in departments]
+    if product[5] == "Completed":
+        print("⚠️ Product is already Completed.")
+        return
+
+    # Only move it if no other station has moved it since it was read
+    current_id = sequence.by_name[current_dept][0]
     if current_dept == "Dispatch":
         print("✅ Product has reached Dispatch. Marking as Completed.")
-        Product.mark_completed(pid)
+        if not Product.mark_completed(pid, expected_department_id=current_id):
+            _report_move_conflict(pid)
         return
 
-    next_index = dept_names.index(current_dept) + 1
-    if next_index < len(dept_names):
-        next_dept_id = departments[next_index][0]
-        Product.move_product(pid, next_dept_id)
-        print(f"➡️ Product moved to {dept_names[next_index]}")
+    next_dept = sequence.next_by_id[current_id]
+    if next_dept:
+        if Product.move_product(pid, next_dept[0], expected_department_id=current_id):
+            print(f"➡️ Product moved to {next_dept[1]}")
+        else:
+            _report_move_conflict(pid)
     else:
         print("⚠️ Product already in the final department.")
 
 
-def delete_product():
-    """Delete a product."""
-    products = Product.get_all_products()
-    if not products:
-        print("\n⚠️ No products found.")
-        return
+def _report_move_conflict(pid):
+    product = Product.get_product(pid)
+    if product:
+        print(f"⚠️ Another station moved this product first. It is now in {product[4]} "
+              f"(Status: {product[5]}); scan it again to move it on.")
+    else:
+        print("❌ Product not found.")
 
-    for p in products:
-        print(f"{p[0]}. {p[1]} - {p[2]}")
 
-    try:
-        pid = int(input("Enter Product ID to delete: "))
-    except ValueError:
+def batch_move_products():
+    """Advance several products, or a whole department, at once."""
+    print("\n🏢 Departments:")
+    departments = Department.get_all_departments()
+    for d in departments:
+        print(f" - {d[1]}")
+
+    selection = input("Enter product IDs (comma-separated) or a department name: ").strip()
+    if not selection:
         print("❌ Invalid input.")
         return
 
-    Product.delete_product(pid)
-    print("✅ Product deleted successfully.")
+    if selection.replace(",", "").replace(" ", "").isdecimal():
+        ids = [int(pid) for pid in selection.split(",") if pid.strip()]
+        moved, completed = Product.move_products_bulk(product_ids=ids)
+    else:
+        dept_ids = {d[1]: d[0] for d in departments}
+        if selection not in dept_ids:
+            print("❌ Department not found.")
+            return
+        moved, completed = Product.move_products_bulk(department_id=dept_ids[selection])
 
+    print(f"➡️ Moved {moved} product(s) to their next department.")
+    if completed:
+        print(f"✅ Marked {completed} product(s) as Completed.")
 
-def list_products():
-    """List all products and their current departments."""
-    products = Product.get_all_products()
-    if not products:
-        print("\n⚠️ No products found.")
+
+def delete_product():
+    """Delete a product."""
+    product = _choose_product("Enter Product ID to delete", lambda p: f"{p[0]}. {p[1]} - {p[2]}")
+    if not product:
         return
+
+    if Product.delete_product(product[0]):
+        print("✅ Product deleted successfully.")
+    else:
+        print("❌ Product not found.")
+
+
+def list_products():
+    """List products and their current departments, a page at a time."""
+    filters = {}
+    client = input("Filter by client (Enter for all): ").strip()
+    if client:
+        filters["client"] = client
+    department = input("Filter by department (Enter for all): ").strip()
+    if department:
+        dept_ids = {d[1]: d[0] for d in Department.get_all_departments()}
+        if department not in dept_ids:
+            print("❌ Department not found.")
+            return
+        filters["department_id"] = dept_ids[department]
+
     print("\n📋 Products:")
-    for p in products:
-        print(f"{p[1]} ({p[2]}) - Department: {p[4]} | Status: {p[5]}")
+    if not _browse_products(lambda p: f"{p[1]} ({p[2]}) - Department: {p[4]} | Status: {p[5]}", **filters):
+        print("⚠️ No products found.")
 
 
 def view_movement_history():
     """View a product’s movement history."""
-    try:
-        pid = int(input("Enter Product ID: "))
-    except ValueError:
-        print("❌ Invalid input.")
-        return
+    answer = input("Enter Product ID or search by name/client: ").strip()
+    if answer.isdecimal():
+        # By id, so archived products can be looked up too
+        pid = int(answer)
+    else:
+        product = _pick_from_search(answer, "Enter Product ID", lambda p: f"{p[0]}. {p[1]} - {p[2]}")
+        if not product:
+            return
+        pid = product[0]
 
     history = Product.get_product_history(pid)
+    if not history:
+        # Not in the live tier; it may have been archived
+        history = Product.get_product_history(pid, include_archived=True)
     if not history:
         print("⚠️ No movement history found.")
         return
@@ -278,18 +421,7 @@ def view_movement_history():
 
 def view_client_summary():
     """Show client summary."""
-    conn = sqlite3.connect("manufacturing.db")
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT client,
-            COUNT(*) as total,
-            SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed,
-            SUM(CASE WHEN status != 'Completed' THEN 1 ELSE 0 END) as pipeline
-        FROM products
-        GROUP BY client
-    """)
-    rows = cur.fetchall()
-    conn.close()
+    rows = Client.get_summary()
 
     if not rows:
         print("\n⚠️ No client data available.")
@@ -300,6 +432,143 @@ def view_client_summary():
         print(f"{r[0]} → Total: {r[1]}, Completed: {r[2]}, Pipeline: {r[3]}")
 
 
+def verify_client_summary():
+    """Check the stored client counters against a full recount."""
+    drift = Client.verify_summary()
+    if not drift:
+        print("✅ Client summary matches the products table.")
+        return
+
+    print(f"⚠️ {len(drift)} client(s) out of sync:")
+    for client, expected, stored in drift:
+        print(f"   {client}: expected {expected}, stored {stored}")
+    if input("Rebuild the client summary now? (y/n): ").strip().lower() == "y":
+        count = Client.rebuild_summary()
+        print(f"✅ Client summary rebuilt for {count} client(s).")
+
+
+def archive_products():
+    """Move completed products finished before a cutoff into the archive."""
+    before = input("Archive products completed before (e.g. 2025-01-01): ").strip()
+    if not before:
+        print("❌ Invalid input.")
+        return
+
+    count = Archive.archive_completed(before, progress=lambda n: print(f"   ... {n} archived"))
+    print(f"🗄️ Archived {count} completed product(s).")
+
+
+RISK_LIMIT = 10   # products listed under "likely to miss their completion date"
+
+
+def view_analytics():
+    """Show dwell time, cycle time, throughput and the current bottleneck."""
+    Analytics.refresh()
+
+    dwell = Analytics.get_dwell_times()
+    if not dwell:
+        print("\n⚠️ Not enough movement history yet.")
+        return
+
+    print("\n⏱️ Average time per department:")
+    for name, visits, avg_hours, max_hours in dwell:
+        print(f"   {name}: {avg_hours}h avg, {max_hours}h max ({visits} visits)")
+
+    completed, cycle_hours = Analytics.get_cycle_time()
+    if completed:
+        print(f"\n🔁 Cycle time: {cycle_hours}h average over {completed} completed product(s)")
+
+    throughput = Analytics.get_daily_throughput(7)
+    if throughput:
+        print("\n📈 Completed per day:")
+        for day, count, _ in throughput:
+            print(f"   {day}: {count}")
+
+    bottleneck = Analytics.get_bottleneck()
+    if bottleneck:
+        print(f"\n🚧 Bottleneck: {bottleneck[0]} ({bottleneck[1]}h avg, {bottleneck[2]} product(s) waiting)")
+
+    at_risk = Analytics.forecast_deadlines(min_risk=0.5, limit=RISK_LIMIT)
+    if at_risk:
+        print("\n⏰ Likely to miss their completion date:")
+        for pid, name, client, department, due, finish, risk in at_risk:
+            print(f"   {pid}. {name} ({client}) in {department}: due {due}, "
+                  f"expected {finish[:16].replace('T', ' ')} ({risk:.0%} chance of being late)")
+
+
+def view_wip_snapshot():
+    """Show how many products sat in each department at a given time."""
+    at = input("Enter date and time (e.g. 2025-10-14 14:00): ").strip()
+    try:
+        Snapshot.normalize_time(at)
+    except ValueError:
+        print("❌ Invalid date/time.")
+        return
+
+    Snapshot.checkpoint()
+    rows = Snapshot.wip_at(at)
+    if not rows:
+        print("\n⚠️ No work in progress at that time.")
+        return
+
+    print(f"\n🕒 Work in progress at {at}:")
+    for name, count in rows:
+        print(f"   {name}: {count}")
+
+
+def view_query_stats():
+    """Show timings collected by the query instrumentation, or switch it on."""
+    stats = database.get_stats()
+    if stats is None:
+        if input("Instrumentation is off. Turn it on? (y/n): ").strip().lower() == "y":
+            database.enable_instrumentation()
+            print(f"✅ Instrumentation on. Statements over {database.SLOW_QUERY_MS:g} ms "
+                  f"go to {database.SLOW_QUERY_LOG}.")
+        return
+
+    print(f"\n📊 {stats['connections_opened']} connection(s) opened, "
+          f"{stats['statements_traced']} statement(s) run")
+    print("\n⏱️ Slowest model calls (total ms / p95 ms / calls):")
+    for name, calls, total_ms, p95_ms in stats["methods"][:10]:
+        print(f"   {name}: {total_ms} / {p95_ms} / {calls}")
+    print("\n🐢 Slowest statements (total ms / p95 ms / calls / rows):")
+    for sql, calls, total_ms, p95_ms, rows, _ in stats["statements"][:10]:
+        print(f"   {total_ms} / {p95_ms} / {calls} / {rows}  {sql[:70]}")
+
+    choice = input("\nReset (r), turn off (o) or keep going (Enter)? ").strip().lower()
+    if choice == "r":
+        database.reset_stats()
+        print("✅ Statistics cleared.")
+    elif choice == "o":
+        database.disable_instrumentation()
+        print("✅ Instrumentation off.")
+
+
+CHANGE_LOG_DAYS = 30   # change-feed history kept by maintenance
+
+
+def run_maintenance():
+    """Purge orphaned rows, reclaim free space and refresh planner statistics."""
+    size, free = Maintenance.get_space()
+    print(f"\n🧹 Database is {size / 1e6:.1f} MB, {free / 1e6:.1f} MB of it free pages.")
+
+    purged = Maintenance.purge_orphans(progress=lambda table, n: print(f"   ... {n} {table} rows purged"))
+    purged["change_log"] = ChangeFeed.prune(datetime.now() - timedelta(days=CHANGE_LOG_DAYS))
+    print("   Rows cleared (orphans and expired changes):")
+    for table, count in purged.items():
+        print(f"   {table}: {count}")
+
+    stranded = Maintenance.get_products_in_missing_departments()
+    if stranded:
+        print(f"⚠️ {len(stranded)} product(s) point at a deleted department and were left as they are:")
+        for product_id, name, department_id in stranded[:20]:
+            print(f"   ID: {product_id} | {name} | department #{department_id}")
+
+    reclaimed = Maintenance.vacuum()
+    Maintenance.optimize()
+    print(f"✅ Reclaimed {reclaimed / 1e6:.1f} MB; planner statistics refreshed.")
+
+
 # --------------------- RUN -----------------------
 
 if __name__ == "__main__":
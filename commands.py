@@ -0,0 +1,467 @@
+"""Non-interactive, scriptable command line for the tracking system.
+
+Each subcommand imports only the model it needs and touches the schema
+only when PRAGMA user_version says it is out of date, so a barcode station
+or cron job pays milliseconds per call rather than a full menu start-up.
+
+    python commands.py products add "Panel 7" Acme 2025-12-31
+    python commands.py products move 12 13 14
+    python commands.py --format json history 12
+    python commands.py --format csv summary
+    python commands.py --instrument analytics dwell
+    python commands.py --format json changes --after 1200 --wait 30
+
+Results go to stdout as text (default), JSON or CSV. Model status messages
+go to stderr so they never corrupt machine-readable output.
+"""
+import csv
+import json
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import click
+
+import database
+
+
+def _quiet():
+    """Send model print() chatter to stderr."""
+    return redirect_stdout(sys.stderr)
+
+
+def _emit(ctx, columns, rows):
+    """Write rows in the format chosen with --format."""
+    fmt = ctx.find_root().params["fmt"]
+    if fmt == "json":
+        click.echo(json.dumps([dict(zip(columns, row)) for row in rows], indent=2))
+    elif fmt == "csv":
+        writer = csv.writer(sys.stdout, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        from tabulate import tabulate
+        click.echo(tabulate(rows, headers=columns))
+
+
+def _repo():
+    """The repository chosen with --backend."""
+    from repositories import get_repository
+    return get_repository(click.get_current_context().find_root().params["backend"])
+
+
+def _department_ids():
+    return {d[1]: d[0] for d in _repo().get_all_departments()}
+
+
+@click.group()
+@click.option("--db", envvar="MANUFACTURING_DB", default=database.DB_NAME, show_default=True,
+              help="SQLite database file.")
+@click.option("--format", "fmt", type=click.Choice(["text", "json", "csv"]), default="text",
+              help="Output format.")
+@click.option("--instrument", is_flag=True, envvar="MANUFACTURING_INSTRUMENT",
+              help="Time every query and model call; print the stats to stderr afterwards.")
+@click.option("--backend", type=click.Choice(["sqlite", "sqlalchemy"]), default="sqlite",
+              envvar="MANUFACTURING_BACKEND", help="Storage backend for product, department, "
+              "leader and summary commands.")
+@click.pass_context
+def main(ctx, db, fmt, instrument, backend):
+    """Manufacturing tracking system."""
+    database.DB_NAME = db
+    if instrument:
+        database.enable_instrumentation()
+        ctx.call_on_close(_print_stats)
+    with _quiet():
+        database.ensure_schema()
+
+
+def _print_stats():
+    from tabulate import tabulate
+
+    stats = database.get_stats()
+    click.echo(f"\n{stats['connections_opened']} connection(s) opened, "
+               f"{stats['statements_traced']} statement(s) run", err=True)
+    click.echo(tabulate(stats["methods"], headers=["method", "calls", "total_ms", "p95_ms"]), err=True)
+    click.echo(tabulate([(sql[:80], *rest) for sql, *rest in stats["statements"]],
+                        headers=["statement", "calls", "total_ms", "p95_ms", "rows", "vm_steps"]), err=True)
+
+
+@main.command("init-db")
+def init_db():
+    """Create or upgrade all tables."""
+    with _quiet():
+        database.init_db()
+
+
+# --------------------- PRODUCTS -----------------------
+
+@main.group()
+def products():
+    """Add, list, move and delete products."""
+
+
+@products.command("add")
+@click.argument("name")
+@click.argument("client")
+@click.argument("completion_date")
+@click.option("--department", help="Starting department (default: the first one).")
+@click.pass_context
+def products_add(ctx, name, client, completion_date, department):
+    """Add a product."""
+    departments = _department_ids()
+    if department and department not in departments:
+        raise click.ClickException(f"Department '{department}' not found.")
+    department_id = departments[department] if department else next(iter(departments.values()), None)
+
+    with _quiet():
+        product_id = _repo().add_product(name, client, completion_date, department_id)
+    if not product_id:
+        raise click.ClickException("Failed to add product.")
+    # Echo what was stored: the client and date are normalized on the way in
+    _emit(ctx, ["id", "name", "client", "completion_date"], [_repo().get_product(product_id)[:4]])
+
+
+@products.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=500, show_default=True)
+@click.pass_context
+def products_import(ctx, path, batch_size):
+    """Bulk-import products from a .csv or .jsonl file."""
+    from models.product import Product
+
+    added, errors = _repo().add_products_bulk(Product.read_import_file(path), batch_size=batch_size)
+    click.echo(f"Imported {added} product(s), skipped {len(errors)}.", err=True)
+    _emit(ctx, ["row", "error"], errors)
+    if errors:
+        ctx.exit(1)
+
+
+@products.command("list")
+@click.option("--client", help="Only this client's products.")
+@click.option("--status", help="Only products with this status.")
+@click.option("--department", help="Only products currently in this department.")
+@click.option("--after-id", default=0, show_default=True, help="Start after this product id.")
+@click.option("--limit", type=int, help="Return at most this many products (one page).")
+@click.pass_context
+def products_list(ctx, client, status, department, after_id, limit):
+    """List products with their current department, in id order."""
+    department_id = None
+    if department:
+        departments = _department_ids()
+        if department not in departments:
+            raise click.ClickException(f"Department '{department}' not found.")
+        department_id = departments[department]
+
+    if limit is not None:
+        rows = _repo().get_products_page(after_id, limit, client, status, department_id)
+    else:
+        rows = _repo().iter_products(client, status, department_id, after_id)
+    _emit(ctx, ["id", "name", "client", "completion_date", "department", "status"], rows)
+
+
+@products.command("search")
+@click.argument("query")
+@click.option("--limit", default=20, show_default=True, help="Return at most this many products.")
+@click.pass_context
+def products_search(ctx, query, limit):
+    """Find products by words (or word prefixes) of their name or client, newest first."""
+    rows = _repo().search(query, limit)
+    _emit(ctx, ["id", "name", "client", "completion_date", "department", "status"], rows)
+
+
+@products.command("move")
+@click.argument("product_ids", nargs=-1, type=int)
+@click.option("--department", help="Move everything currently in this department.")
+@click.pass_context
+def products_move(ctx, product_ids, department):
+    """Advance products to their next department."""
+    if bool(product_ids) == bool(department):
+        raise click.UsageError("Pass either product ids or --department.")
+    if department:
+        departments = _department_ids()
+        if department not in departments:
+            raise click.ClickException(f"Department '{department}' not found.")
+        moved, completed = _repo().move_products_bulk(department_id=departments[department])
+    else:
+        moved, completed = _repo().move_products_bulk(product_ids=product_ids)
+    _emit(ctx, ["moved", "completed"], [(moved, completed)])
+
+
+@products.command("delete")
+@click.argument("product_id", type=int)
+def products_delete(product_id):
+    """Delete a product and its history."""
+    if not _repo().delete_product(product_id):
+        raise click.ClickException(f"Product {product_id} not found.")
+
+
+@main.command()
+@click.argument("product_id", type=int)
+@click.option("--archived", is_flag=True, help="Include the archive tier.")
+@click.pass_context
+def history(ctx, product_id, archived):
+    """Show a product's movement history."""
+    try:
+        rows = _repo().get_product_history(product_id, include_archived=archived)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    _emit(ctx, ["department", "timestamp"], [(r[0] or "Completed", r[1]) for r in rows])
+
+
+@main.command()
+@click.option("--verify", is_flag=True, help="Report clients whose stored counters drifted.")
+@click.option("--rebuild", is_flag=True, help="Recompute the counters from products first.")
+@click.option("--archived", is_flag=True, help="Include archived products in the totals.")
+@click.pass_context
+def summary(ctx, verify, rebuild, archived):
+    """Show totals, completed and pipeline counts per client."""
+    from models.client import Client
+
+    if rebuild:
+        Client.rebuild_summary()
+    if verify:
+        drift = Client.verify_summary()
+        _emit(ctx, ["client", "expected", "stored"], drift)
+        if drift:
+            ctx.exit(1)
+        return
+    try:
+        rows = _repo().get_summary(include_archived=archived)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    _emit(ctx, ["client", "total", "completed", "pipeline"], rows)
+
+
+@main.command()
+@click.argument("before")
+@click.option("--batch-size", default=500, show_default=True)
+@click.pass_context
+def archive(ctx, before, batch_size):
+    """Archive completed products finished before BEFORE (ISO date)."""
+    from models.archive import Archive
+
+    count = Archive.archive_completed(before, batch_size=batch_size,
+                                      progress=lambda n: click.echo(f"... {n} archived", err=True))
+    _emit(ctx, ["archived"], [(count,)])
+
+
+@main.command()
+@click.option("--batch-size", default=500, show_default=True, help="Products purged per transaction.")
+@click.option("--vacuum-pages", default=2000, show_default=True,
+              help="Pages released per incremental vacuum step.")
+@click.option("--keep-changes", default=30, show_default=True,
+              help="Days of change-feed history to keep.")
+@click.pass_context
+def maintenance(ctx, batch_size, vacuum_pages, keep_changes):
+    """Purge orphaned rows, reclaim free space and refresh planner statistics."""
+    from models.change_feed import ChangeFeed
+    from models.maintenance import Maintenance
+
+    size_before = Maintenance.get_space()[0]
+    purged = Maintenance.purge_orphans(batch_size=batch_size)
+    purged["change_log"] = ChangeFeed.prune(datetime.now() - timedelta(days=keep_changes))
+    stranded = Maintenance.get_products_in_missing_departments()
+    if stranded:
+        click.echo(f"⚠️ {len(stranded)} product(s) point at a deleted department: "
+                   f"{', '.join(str(row[0]) for row in stranded[:20])}", err=True)
+    with _quiet():
+        reclaimed = Maintenance.vacuum(vacuum_pages)
+    Maintenance.optimize()
+    _emit(ctx, ["item", "count"], [
+        *((f"rows cleared from {table}", count) for table, count in purged.items()),
+        ("products in deleted departments", len(stranded)),
+        ("bytes before", size_before),
+        ("bytes reclaimed", reclaimed),
+    ])
+
+
+@main.command()
+@click.option("--after", default=0, show_default=True, help="Cursor: the last seq already processed.")
+@click.option("--limit", default=500, show_default=True)
+@click.option("--wait", default=0.0, show_default=True,
+              help="Seconds to wait for a change when there is none yet.")
+@click.option("--latest", is_flag=True, help="Only print the newest seq, to start following from.")
+@click.pass_context
+def changes(ctx, after, limit, wait, latest):
+    """Product, department and team-leader changes after a cursor, oldest first.
+
+    The cursor to pass as --after next time is printed to stderr. A new
+    consumer takes `changes --latest`, reads the current state, then
+    follows the feed from that cursor.
+    """
+    from models.change_feed import ChangeFeed, CursorExpired
+
+    if latest:
+        _emit(ctx, ["cursor"], [(ChangeFeed.get_cursor(),)])
+        return
+    try:
+        rows = ChangeFeed.wait_for_changes(after, wait, limit) if wait else ChangeFeed.get_changes(after, limit)
+    except CursorExpired as e:
+        raise click.ClickException(str(e))
+    _emit(ctx, ["seq", "entity", "entity_id", "op", "changed_at"], rows)
+    click.echo(f"cursor: {rows[-1][0] if rows else after}", err=True)
+
+
+# --------------------- ANALYTICS -----------------------
+
+@main.group()
+@click.option("--full", is_flag=True, help="Recompute from the whole movement log.")
+def analytics(full):
+    """Dwell time, cycle time, throughput, bottleneck and deadline-risk reports."""
+    from models.analytics import Analytics
+
+    Analytics.refresh(full=full)
+
+
+@analytics.command("dwell")
+@click.pass_context
+def analytics_dwell(ctx):
+    """Average and maximum time spent in each department."""
+    from models.analytics import Analytics
+
+    _emit(ctx, ["department", "visits", "avg_hours", "max_hours"], Analytics.get_dwell_times())
+
+
+@analytics.command("cycle")
+@click.pass_context
+def analytics_cycle(ctx):
+    """Average end-to-end cycle time of completed products."""
+    from models.analytics import Analytics
+
+    _emit(ctx, ["completed", "avg_cycle_hours"], [Analytics.get_cycle_time()])
+
+
+@analytics.command("throughput")
+@click.option("--days", default=14, show_default=True)
+@click.pass_context
+def analytics_throughput(ctx, days):
+    """Products completed per day."""
+    from models.analytics import Analytics
+
+    _emit(ctx, ["day", "completed", "avg_cycle_hours"], Analytics.get_daily_throughput(days))
+
+
+@analytics.command("bottleneck")
+@click.pass_context
+def analytics_bottleneck(ctx):
+    """The department where in-progress work waits longest."""
+    from models.analytics import Analytics
+
+    bottleneck = Analytics.get_bottleneck()
+    _emit(ctx, ["department", "avg_hours", "wip"], [bottleneck] if bottleneck else [])
+
+
+@analytics.command("risk")
+@click.option("--min-risk", default=0.5, show_default=True,
+              help="Smallest chance of being late to report (0 lists every product).")
+@click.option("--limit", default=50, show_default=True)
+@click.pass_context
+def analytics_risk(ctx, min_risk, limit):
+    """In-progress products likely to miss their completion date."""
+    from models.analytics import Analytics
+
+    _emit(ctx, ["id", "name", "client", "department", "completion_date", "expected_finish", "late_risk"],
+          Analytics.forecast_deadlines(min_risk, limit=limit))
+
+
+@main.command()
+@click.argument("at")
+@click.option("--archived", is_flag=True, help="Include archived products (replays the full log).")
+@click.option("--interval-hours", default=168, show_default=True,
+              help="Spacing of the checkpoints taken before answering.")
+@click.pass_context
+def wip(ctx, at, archived, interval_hours):
+    """Products in progress per department at time AT (ISO date/time)."""
+    from models.snapshot import Snapshot
+
+    try:
+        Snapshot.normalize_time(at)
+    except ValueError:
+        raise click.BadParameter(f"'{at}' is not an ISO date/time.", param_hint="AT")
+    Snapshot.checkpoint(interval_hours)
+    _emit(ctx, ["department", "wip"], Snapshot.wip_at(at, include_archived=archived))
+
+
+@main.command()
+@click.option("--log", "log_path", help="Slow-query log to read (default: MANUFACTURING_SLOW_LOG).")
+@click.option("--top", default=20, show_default=True, help="Show the statements with the most total time.")
+@click.pass_context
+def stats(ctx, log_path, top):
+    """Summarise the slow-query log written by --instrument runs."""
+    _emit(ctx, ["statement", "count", "total_ms", "p95_ms", "max_ms"], database.read_slow_log(log_path)[:top])
+
+
+# --------------------- DEPARTMENTS -----------------------
+
+@main.group()
+def departments():
+    """List, add and delete departments."""
+
+
+@departments.command("list")
+@click.pass_context
+def departments_list(ctx):
+    """List departments in production order."""
+    _emit(ctx, ["id", "name", "order_no"], _repo().get_all_departments())
+
+
+@departments.command("add")
+@click.argument("name")
+@click.option("--before", default="", help="Insert before this department (default: at the end).")
+def departments_add(name, before):
+    """Add a department."""
+    if not name.replace(" ", "").isalpha():
+        raise click.ClickException("Department name must contain only letters and spaces.")
+    _repo().add_department(name, before)
+
+
+@departments.command("delete")
+@click.argument("name")
+def departments_delete(name):
+    """Delete a department that no product is in."""
+    repo = _repo()
+    if name not in repo.get_sequence().by_name:
+        raise click.ClickException(f"Department '{name}' not found.")
+    with _quiet():
+        deleted = repo.delete_department(name)
+    if not deleted:
+        raise click.ClickException(f"Department '{name}' still has products.")
+
+
+# --------------------- TEAM LEADERS -----------------------
+
+@main.group()
+def leaders():
+    """List, add and delete team leaders."""
+
+
+@leaders.command("list")
+@click.pass_context
+def leaders_list(ctx):
+    """List team leaders and their departments."""
+    _emit(ctx, ["id", "name", "department"], _repo().get_all_team_leaders())
+
+
+@leaders.command("add")
+@click.argument("name")
+@click.argument("department_id", type=int)
+def leaders_add(name, department_id):
+    """Assign a new team leader to a department."""
+    with _quiet():
+        added = _repo().add_team_leader(name, department_id)
+    if not added:
+        raise click.ClickException("Failed to add team leader.")
+
+
+@leaders.command("delete")
+@click.argument("name")
+def leaders_delete(name):
+    """Delete a team leader."""
+    with _quiet():
+        deleted = _repo().delete_team_leader(name)
+    if not deleted:
+        raise click.ClickException(f"Team leader '{name}' not found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,860 @@
 import sqlite3
 import os
+import atexit
+import functools
+import importlib
+import inspect
+import pathlib
+import pkgutil
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 
-DB_NAME = "manufacturing.db"
+DB_NAME = os.environ.get("MANUFACTURING_DB", "manufacturing.db")
+
+# Applied once to every pooled connection, right after it is opened.
+CONNECTION_PRAGMAS = (
+    # Only takes effect on a new file (it must precede journal_mode) or at
+    # the next VACUUM; lets Maintenance hand freed pages back in steps
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",        # readers never block the writer
+    "PRAGMA synchronous = NORMAL",      # fsync on checkpoint, not on every commit
+    "PRAGMA busy_timeout = 5000",       # wait up to 5s for another station's lock
+    "PRAGMA mmap_size = 268435456",     # 256 MB memory-mapped reads
+    "PRAGMA cache_size = -20000",       # ~20 MB page cache (negative = KiB)
+    "PRAGMA temp_store = MEMORY",
+)
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_open_connections = []
+
+
+def _open_connection(path):
+    """Open a new connection and apply the tuning pragmas."""
+    instrument = _instrument
+    factory = _InstrumentedConnection if instrument else sqlite3.Connection
+    # uri=True lets ATTACH take file: URIs (archive_attached(read_only=True))
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False, factory=factory, uri=True)
+    if instrument:
+        instrument.attach(conn)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    with _pool_lock:
+        _open_connections.append(conn)
+    return conn
 
 
 def get_connection():
-    """Establish and return a database connection."""
-    return sqlite3.connect(DB_NAME)
+    """Return this thread's pooled connection, opening it on first use.
+
+    Connections stay open for the life of the thread, so callers must not
+    close them. Use transaction() for writes.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(DB_NAME)
+    if conn is None:
+        conn = connections[DB_NAME] = _open_connection(DB_NAME)
+    return conn
+
+
+def close_connection():
+    """Close this thread's pooled connections (e.g. when a worker exits)."""
+    connections = getattr(_local, "connections", None) or {}
+    for conn in connections.values():
+        with _pool_lock:
+            if conn in _open_connections:
+                _open_connections.remove(conn)
+        conn.close()
+    connections.clear()
+    # A new connection restarts data_version, so forget what was seen
+    getattr(_local, "data_versions", {}).clear()
+
+
+@atexit.register
+def close_all_connections():
+    """Close every pooled connection so WAL files are checkpointed on exit."""
+    with _pool_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.__dict__.clear()
+
+
+# --------------------- INSTRUMENTATION -----------------------
+
+SLOW_QUERY_MS = float(os.environ.get("MANUFACTURING_SLOW_MS", 100))
+SLOW_QUERY_LOG = os.environ.get("MANUFACTURING_SLOW_LOG", "slow_queries.log")
+PROGRESS_STEPS = 1000   # VM instructions between progress-handler calls
+
+# The active _Instrumentation, or None. While it is None connections are
+# plain sqlite3 connections and no model method is wrapped, so the only
+# cost is this check when a connection is opened.
+_instrument = None
+
+
+class _Timings:
+    """Call count, total time, rows and recent latencies for one key."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.rows = 0
+        self.vm_steps = 0
+        self.samples = deque(maxlen=1000)
+
+    def add(self, ms, rows=0, vm_steps=0):
+        self.count += 1
+        self.total_ms += ms
+        self.rows += rows
+        self.vm_steps += vm_steps
+        self.samples.append(ms)
+
+    def p95(self):
+        ordered = sorted(self.samples)
+        return ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0
+
+
+class _Instrumentation:
+    """Counters collected while instrumentation is enabled."""
+
+    def __init__(self, slow_ms, slow_log):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.lock = threading.Lock()
+        self.statements = {}
+        self.methods = {}
+        self.connections_opened = 0
+        self.statements_traced = 0
+        self.wrapped = []
+
+    def attach(self, conn):
+        """Hook a newly opened connection's trace and progress callbacks."""
+        with self.lock:
+            self.connections_opened += 1
+        conn.set_trace_callback(self.trace)
+        conn.set_progress_handler(conn.tick, PROGRESS_STEPS)
+
+    def trace(self, sql):
+        # Counts every statement SQLite runs, including those inside
+        # triggers and transaction control, which never reach a cursor.
+        self.statements_traced += 1
+
+    def record_statement(self, sql, ms, rows, vm_steps):
+        key = " ".join(sql.split())
+        with self.lock:
+            self.statements.setdefault(key, _Timings()).add(ms, rows, vm_steps)
+        if ms >= self.slow_ms:
+            with self.lock, open(self.slow_log, "a", encoding="utf-8") as log:
+                log.write(f"{datetime.now().isoformat()}\t{ms:.3f}\t{rows}\t{key}\n")
+
+    def record_method(self, name, ms):
+        with self.lock:
+            self.methods.setdefault(name, _Timings()).add(ms)
+
+    def timed(self, name, func):
+        """Wrap a model function so each call is timed under `name`."""
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    yield from func(*args, **kwargs)
+                finally:
+                    self.record_method(name, (time.perf_counter() - start) * 1000)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record_method(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+
+    def wrap_models(self):
+        """Time every public static method of the classes in models/."""
+        import models
+        for info in pkgutil.iter_modules(models.__path__):
+            module = importlib.import_module(f"models.{info.name}")
+            for cls in list(vars(module).values()):
+                if not isinstance(cls, type) or cls.__module__ != module.__name__:
+                    continue
+                for name, attr in list(vars(cls).items()):
+                    if isinstance(attr, staticmethod) and not name.startswith("_"):
+                        timed = self.timed(f"{cls.__name__}.{name}", attr.__func__)
+                        setattr(cls, name, staticmethod(timed))
+                        self.wrapped.append((cls, name, attr))
+
+    def unwrap_models(self):
+        for cls, name, attr in reversed(self.wrapped):
+            setattr(cls, name, attr)
+        self.wrapped.clear()
+
+
+class _InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times each statement, including the fetches of its rows.
+
+    A statement's sample is recorded when the cursor runs the next one, is
+    closed or is garbage collected.
+    """
+
+    _sql = None
+
+    def _start(self, sql):
+        self._finish()
+        self._sql = sql
+        self._elapsed = 0.0
+        self._rows = 0
+        self._steps = self.connection.steps
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        rows = self._rows or max(self.rowcount, 0)
+        steps = (self.connection.steps - self._steps) * PROGRESS_STEPS
+        instrument = _instrument
+        if instrument:
+            instrument.record_statement(self._sql, self._elapsed, rows, steps)
+        self._sql = None
+
+    def _timed(self, call, *args):
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            self._elapsed += (time.perf_counter() - start) * 1000
+
+    def execute(self, sql, parameters=()):
+        self._start(sql)
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql)
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        self._rows += row is not None
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._timed(super().__next__)
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class _InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including execute() shortcuts, are timed."""
+
+    steps = 0
+
+    def tick(self):
+        self.steps += 1
+        return 0
+
+    def cursor(self, factory=_InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def enable_instrumentation(slow_ms=None, slow_log=None):
+    """Start collecting query and model-method statistics.
+
+    Statements slower than `slow_ms` (default MANUFACTURING_SLOW_MS, 100)
+    are appended to `slow_log`. This thread's pooled connections are
+    reopened with instrumentation hooked in; enable it at start-up, before
+    worker threads open theirs.
+    """
+    global _instrument
+    if _instrument is None:
+        instrument = _Instrumentation(SLOW_QUERY_MS if slow_ms is None else slow_ms,
+                                      slow_log or SLOW_QUERY_LOG)
+        instrument.wrap_models()
+        close_connection()
+        _instrument = instrument
+    return _instrument
+
+
+def disable_instrumentation():
+    """Stop collecting, restore the plain model methods and connections."""
+    global _instrument
+    if _instrument is not None:
+        _instrument.unwrap_models()
+        _instrument = None
+        close_connection()
+
+
+def instrumentation_enabled():
+    return _instrument is not None
+
+
+def get_stats():
+    """Return the statistics collected so far, or None when disabled.
+
+    A dict with connections_opened, statements_traced, and `statements`
+    and `methods` lists sorted by total time. Statement rows are
+    (sql, count, total_ms, p95_ms, rows, vm_steps); method rows are
+    (name, count, total_ms, p95_ms).
+    """
+    instrument = _instrument
+    if instrument is None:
+        return None
+    with instrument.lock:
+        statements = [(sql, t.count, round(t.total_ms, 3), round(t.p95(), 3), t.rows, t.vm_steps)
+                      for sql, t in instrument.statements.items()]
+        methods = [(name, t.count, round(t.total_ms, 3), round(t.p95(), 3))
+                   for name, t in instrument.methods.items()]
+        return {
+            "connections_opened": instrument.connections_opened,
+            "statements_traced": instrument.statements_traced,
+            "statements": sorted(statements, key=lambda r: r[2], reverse=True),
+            "methods": sorted(methods, key=lambda r: r[2], reverse=True),
+        }
+
+
+def reset_stats():
+    """Clear the collected statistics, keeping instrumentation enabled."""
+    instrument = _instrument
+    if instrument is not None:
+        with instrument.lock:
+            instrument.statements.clear()
+            instrument.methods.clear()
+            instrument.connections_opened = 0
+            instrument.statements_traced = 0
+
+
+def read_slow_log(path=None):
+    """Aggregate the slow-query log into (sql, count, total_ms, p95_ms, max_ms) rows."""
+    path = path or SLOW_QUERY_LOG
+    timings = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as log:
+            for line in log:
+                parts = line.rstrip("\n").split("\t", 3)
+                if len(parts) == 4:
+                    timings.setdefault(parts[3], _Timings()).add(float(parts[1]))
+    rows = [(sql, t.count, round(t.total_ms, 3), round(t.p95(), 3), round(max(t.samples), 3))
+            for sql, t in timings.items()]
+    return sorted(rows, key=lambda r: r[2], reverse=True)
+
+
+# --------------------- CHANGE DETECTION & CACHE -----------------------
+
+_generation = 0
+_generation_lock = threading.Lock()
+_cache = {}
+
+
+def bump_generation():
+    """Invalidate cached reads after a write made through this process.
+
+    A connection's PRAGMA data_version only moves when *other* connections
+    commit, so writers whose changes must show up in cached reads (e.g.
+    department edits) call this after committing.
+    """
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+def data_generation():
+    """Return a process-wide counter that changes whenever the data may have.
+
+    Checks PRAGMA data_version on this thread's connection, which is a
+    cheap read that changes when any other connection or process commits,
+    and bumps the counter when it moves (or is seen for the first time).
+    """
+    version = get_connection().execute("PRAGMA data_version").fetchone()[0]
+    seen = getattr(_local, "data_versions", None)
+    if seen is None:
+        seen = _local.data_versions = {}
+    if seen.get(DB_NAME) != version:
+        seen[DB_NAME] = version
+        bump_generation()
+    return _generation
+
+
+def cached(key, loader):
+    """Return loader()'s result, reusing it until the data changes.
+
+    Entries are stamped with the database file and data_generation(), so a
+    commit from any other connection, or a bump_generation() call, makes
+    the next lookup reload.
+    """
+    stamp = (DB_NAME, data_generation())
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    value = loader()
+    _cache[key] = (stamp, value)
+    return value
+
+
+@contextmanager
+def transaction(immediate=True):
+    """Run a block of statements as one transaction on the pooled connection.
+
+    Yields a cursor. The transaction commits when the block exits and rolls
+    back if it raises. Nested blocks join the outer transaction, so only the
+    outermost one commits. BEGIN IMMEDIATE takes the write lock up front,
+    which avoids lock-upgrade failures between concurrent stations.
+    """
+    conn = get_connection()
+    depth = getattr(_local, "depth", 0)
+    if depth == 0 and not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    _local.depth = depth + 1
+    try:
+        yield conn.cursor()
+    except BaseException:
+        _local.depth = depth
+        if depth == 0:
+            conn.rollback()
+        raise
+    _local.depth = depth
+    if depth == 0:
+        conn.commit()
+
+
+# --------------------- TABLE REBUILDS -----------------------
+
+def _column_info(table, column, schema="main"):
+    """PRAGMA table_info row of `column`, or None if the table or column is missing."""
+    rows = get_connection().execute(f"PRAGMA {schema}.table_info({table})").fetchall()
+    return next((row for row in rows if row[1] == column), None)
+
+
+def _column_type(table, column, schema="main"):
+    """Declared type of `column`, or None if the table or column is missing."""
+    info = _column_info(table, column, schema)
+    return info[2] if info else None
+
+
+def rebuild_table(table, columns, create_sql, expressions=None, prepare_sql=None,
+                  schema="main", batch_size=50_000):
+    """Copy a table into a new definition, in batches, and swap it in.
+
+    SQLite cannot change a column's type in place, so rows are streamed in
+    id order into a copy created by `create_sql` (formatted with the copy's
+    qualified name), one batch per transaction so the write lock is only
+    ever held briefly. `expressions` maps a target column to the SQL that
+    computes it from the old row; other columns are copied as they are.
+    `prepare_sql`, if given, runs first in each batch with the same
+    (last id, batch size) parameters as the copy.
+
+    The batch that catches up also swaps the copy in, so rows written
+    meanwhile are not lost, and an interrupted run resumes where it
+    stopped. Progress is printed after each batch of a multi-batch copy.
+    Indexes and triggers on the old table are dropped with it; the
+    migration step that called this recreates them.
+    """
+    conn = get_connection()
+    conn.create_function("iso_to_us", 2, _iso_to_us_sql, deterministic=True)
+    conn.create_function("client_name", 1, normalize_client_name, deterministic=True)
+    expressions = expressions or {}
+    copy = f"{table}_new"
+    conn.execute(create_sql.format(name=f"{schema}.{copy}"))
+    selected = ", ".join(expressions.get(c, c) for c in columns)
+    total = conn.execute(f"SELECT COUNT(*) FROM {schema}.{table}").fetchone()[0]
+    copied = conn.execute(f"SELECT COUNT(*) FROM {schema}.{copy}").fetchone()[0]
+    while True:
+        with transaction() as cur:
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {schema}.{copy}")
+            last_id = cur.fetchone()[0]
+            if prepare_sql:
+                cur.execute(prepare_sql.format(schema=schema), (last_id, batch_size))
+            cur.execute(f"""
+                INSERT INTO {schema}.{copy} ({", ".join(columns)})
+                SELECT {selected} FROM {schema}.{table}
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (last_id, batch_size))
+            copied += cur.rowcount
+            if cur.rowcount == batch_size:
+                print(f"   {table}: {copied:,} / {total:,} rows copied")
+                continue
+            # Keep AUTOINCREMENT from reissuing ids of rows deleted at the end
+            cur.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = 'sqlite_sequence'")
+            if cur.fetchone():
+                cur.execute(f"""
+                    UPDATE {schema}.sqlite_sequence
+                    SET seq = MAX(seq, COALESCE((SELECT seq FROM {schema}.sqlite_sequence WHERE name = ?), 0))
+                    WHERE name = ?
+                """, (table, copy))
+            cur.execute(f"DROP TABLE {schema}.{table}")
+            cur.execute(f"ALTER TABLE {schema}.{copy} RENAME TO {table}")
+            return
+
+
+# --------------------- TIMESTAMPS -----------------------
+# Movement, checkpoint and progress times are stored as INTEGER microseconds
+# since the Unix epoch (UTC): they order and compare as plain integers,
+# range scans on the time indexes are cheap, and a row holds 8 bytes
+# instead of a 26-character string.
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# SQL expression for "now" in epoch microseconds, for column defaults.
+NOW_US_SQL = "(CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER))"
+
+
+def now_us():
+    """Current time in epoch microseconds."""
+    return time.time_ns() // 1000
+
+
+def to_us(value, naive_utc=False):
+    """Convert a datetime, ISO 8601 string or epoch-µs int to epoch microseconds.
+
+    Naive values are taken as local time, which is how the app used to
+    write them, or as UTC with naive_utc=True (SQLite's CURRENT_TIMESTAMP).
+    Raises ValueError for text that is not ISO 8601.
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc) if naive_utc else value.astimezone()
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def format_us(us):
+    """Epoch microseconds as local ISO 8601 text, for display."""
+    if us is None:
+        return None
+    return (_EPOCH + us * _MICROSECOND).astimezone().replace(tzinfo=None).isoformat()
+
+
+def _iso_to_us_sql(value, naive_utc):
+    # SQL function used by the migration; leaves already-converted values alone
+    if value is None or isinstance(value, int):
+        return value
+    return to_us(value, naive_utc=bool(naive_utc))
+
+
+def convert_time_column(table, columns, create_sql, time_column, naive_utc=False, schema="main"):
+    """Rewrite a table's ISO-text time column as epoch microseconds (see rebuild_table)."""
+    expression = f"iso_to_us({time_column}, {int(naive_utc)})"
+    rebuild_table(table, columns, create_sql, {time_column: expression}, schema=schema)
+
+
+def _time_column_is_text(table, column, schema="main"):
+    return (_column_type(table, column, schema) or "").upper() == "TEXT"
+
+
+MOVEMENTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        department_id INTEGER,
+        timestamp INTEGER NOT NULL,
+        FOREIGN KEY(product_id) REFERENCES products(id),
+        FOREIGN KEY(department_id) REFERENCES departments(id)
+    )
+"""
+
+ARCHIVE_MOVEMENTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL,
+        department_id INTEGER,
+        timestamp INTEGER NOT NULL
+    )
+"""
+
+CHECKPOINTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        taken_at INTEGER UNIQUE NOT NULL
+    )
+"""
+
+PROGRESS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        progress INTEGER DEFAULT 0,
+        updated_at INTEGER DEFAULT """ + NOW_US_SQL + """,
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    )
+"""
+
+
+def _migrate_timestamps():
+    """Convert tables still holding ISO-text times (schema version < 5)."""
+    department = _column_info("product_movements", "department_id")
+    # The same copy lets the oldest tables' NOT NULL department_id hold completions
+    if _time_column_is_text("product_movements", "timestamp") or (department and department[3]):
+        convert_time_column("product_movements", ("id", "product_id", "department_id", "timestamp"),
+                            MOVEMENTS_TABLE_SQL, "timestamp")
+    if _time_column_is_text("wip_checkpoints", "taken_at"):
+        convert_time_column("wip_checkpoints", ("id", "taken_at"), CHECKPOINTS_TABLE_SQL, "taken_at")
+    if _time_column_is_text("progress", "updated_at"):
+        convert_time_column("progress", ("id", "product_id", "progress", "updated_at"),
+                            PROGRESS_TABLE_SQL, "updated_at", naive_utc=True)
+
+
+# --------------------- CLIENTS -----------------------
+# Products reference clients.id instead of repeating the client's name on
+# every row. Names are unique regardless of case and spacing, so "Acme",
+# "ACME" and "Acme " are one client (the first spelling seen is kept).
+
+CLIENTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL COLLATE NOCASE
+    )
+"""
+
+PRODUCTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        client_id INTEGER NOT NULL,
+        completion_date TEXT NOT NULL,
+        department_id INTEGER,
+        status TEXT DEFAULT 'In Progress',
+        FOREIGN KEY(client_id) REFERENCES clients(id),
+        FOREIGN KEY(department_id) REFERENCES departments(id)
+    )
+"""
+
+# Archived products keep the id of their client in the live clients table.
+ARCHIVE_PRODUCTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        client_id INTEGER NOT NULL,
+        completion_date TEXT NOT NULL,
+        department_id INTEGER,
+        status TEXT
+    )
+"""
+
+PRODUCT_COLUMNS = ("id", "name", "client_id", "completion_date", "department_id", "status")
+
+# Adds the new clients named in the next batch of a products rebuild, in
+# order of first appearance. Known names are filtered out first, since even
+# an ignored insert would use up an AUTOINCREMENT id.
+INTERN_CLIENTS_SQL = """
+    INSERT OR IGNORE INTO main.clients (name)
+    SELECT clean FROM (
+        SELECT client_name(client) AS clean, MIN(id) AS first_id
+        FROM (SELECT id, client FROM {schema}.products WHERE id > ? ORDER BY id LIMIT ?)
+        GROUP BY clean COLLATE NOCASE
+    )
+    WHERE NOT EXISTS (SELECT 1 FROM main.clients c WHERE c.name = clean)
+    ORDER BY first_id
+"""
+CLIENT_ID_SQL = "(SELECT id FROM main.clients WHERE name = client_name(client))"
+
+
+def normalize_client_name(name):
+    """Trim a client name and collapse inner runs of whitespace."""
+    return " ".join(str(name).split())
+
+
+def _migrate_clients():
+    """Replace products.client names with client ids (schema version < 6)."""
+    if _column_type("products", "client") is None:
+        return
+    conn = get_connection()
+    conn.create_function("client_name", 1, normalize_client_name, deterministic=True)
+    conn.execute(CLIENTS_TABLE_SQL.format(name="clients"))
+    clients_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'clients'").fetchone()[0]
+    if "NOCASE" not in clients_sql.upper():
+        # Created unused by older versions, without case-insensitive names
+        with transaction() as cur:
+            cur.execute(CLIENTS_TABLE_SQL.format(name="clients_new"))
+            cur.execute("""
+                INSERT OR IGNORE INTO clients_new (id, name)
+                SELECT id, client_name(name) FROM clients ORDER BY id
+            """)
+            cur.execute("DROP TABLE IF EXISTS clients")
+            cur.execute("ALTER TABLE clients_new RENAME TO clients")
+    rebuild_table("products", PRODUCT_COLUMNS, PRODUCTS_TABLE_SQL, {"client_id": CLIENT_ID_SQL},
+                  prepare_sql=INTERN_CLIENTS_SQL)
+    # Keyed by name; _link_clients rebuilds it keyed by client id
+    with transaction() as cur:
+        cur.execute("DROP TABLE IF EXISTS client_summary")
+
+
+def _migrate_archive_timestamps():
+    if _time_column_is_text("product_movements", "timestamp", schema="archive"):
+        convert_time_column("product_movements", ("id", "product_id", "department_id", "timestamp"),
+                            ARCHIVE_MOVEMENTS_TABLE_SQL, "timestamp", schema="archive")
+
+
+def _migrate_archive_clients():
+    if _column_type("products", "client", schema="archive") is not None:
+        rebuild_table("products", PRODUCT_COLUMNS, ARCHIVE_PRODUCTS_TABLE_SQL,
+                      {"client_id": CLIENT_ID_SQL}, prepare_sql=INTERN_CLIENTS_SQL, schema="archive")
+
+
+# --------------------- ARCHIVE TIER -----------------------
+
+def archive_db_name():
+    """Return the archive database file that sits next to DB_NAME."""
+    root, ext = os.path.splitext(DB_NAME)
+    return os.environ.get("MANUFACTURING_ARCHIVE_DB", f"{root}_archive{ext or '.db'}")
+
+
+@contextmanager
+def archive_attached(read_only=False):
+    """Attach the archive database as schema `archive` for a block.
+
+    The archive is only attached while it is needed, so everyday writes
+    never lock or journal a second file. Yields the pooled connection.
+
+    With read_only=True the archive is opened with mode=ro, so reads never
+    create it, and the block gets None when there is no archive file yet.
+    An archive from an older version of the app is upgraded first.
+    """
+    conn = get_connection()
+    if any(row[1] == "archive" for row in conn.execute("PRAGMA database_list")):
+        yield conn
+        return
+
+    path = archive_db_name()
+    if read_only:
+        if not os.path.exists(path):
+            yield None
+            return
+        if _archive_version(path) < ARCHIVE_MIGRATIONS[-1][0]:
+            # The file exists, so this only upgrades it; nothing new is created
+            with archive_attached():
+                pass
+        conn.execute("ATTACH DATABASE ? AS archive", (_read_only_uri(path),))
+    else:
+        conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        if not read_only:
+            migrate(ARCHIVE_MIGRATIONS, schema="archive")
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DETACH DATABASE archive")
+
+
+def _read_only_uri(path):
+    return f"{pathlib.Path(path).resolve().as_uri()}?mode=ro"
+
+
+def _archive_version(path):
+    """Read the archive's user_version without creating or locking it for writes."""
+    conn = sqlite3.connect(_read_only_uri(path), uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# Recomputes client_summary from products with a full GROUP BY.
+CLIENT_SUMMARY_REBUILD_SQL = """
+    INSERT INTO client_summary (client_id, total, completed, pipeline)
+    SELECT client_id,
+        COUNT(*),
+        SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN status != 'Completed' THEN 1 ELSE 0 END)
+    FROM products
+    GROUP BY client_id
+"""
 
 
 def init_db():
     """Initialize or upgrade the database with all required tables."""
+    migrate()
+    print("✅ Database initialized and upgraded successfully.")
+
+
+def ensure_schema():
+    """Create or upgrade the schema only when it is out of date.
+
+    When the database is already at SCHEMA_VERSION this costs a single
+    PRAGMA read, so short-lived commands can call it on every launch.
+    Returns True if the schema had to be upgraded.
+    """
+    conn = get_connection()
+    if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+        return False
+    return migrate()
+
+
+# --------------------- SCHEMA MIGRATIONS -----------------------
+# PRAGMA user_version holds the number of the last step applied. A step is
+# (version, description, prepare, apply): `prepare`, if set, runs first and
+# outside any transaction, for copies that commit in batches (rebuild_table);
+# `apply(cur)` then runs in one transaction together with the version bump.
+# Steps are idempotent, so an interrupted step simply runs again, and
+# databases from before user_version was kept (version 0) take every step.
+# To change the schema, append a step; never edit one that has shipped.
+
+def migrate(migrations=None, schema="main"):
+    """Apply the steps of `migrations` newer than the schema's user_version.
+
+    Returns True if any step ran. Raises RuntimeError for a database
+    written by a newer version of the app.
+    """
+    migrations = migrations or MIGRATIONS
     conn = get_connection()
-    cur = conn.cursor()
+    version = conn.execute(f"PRAGMA {schema}.user_version").fetchone()[0]
+    target = migrations[-1][0]
+    if version > target:
+        raise RuntimeError(f"The {schema} database is at schema version {version}, "
+                           f"newer than this app supports ({target}).")
+
+    for step, description, prepare, apply in migrations:
+        if step <= version:
+            continue
+        print(f"🧱 Upgrading {schema} schema to version {step}: {description}...")
+        if prepare:
+            prepare()
+        with transaction() as cur:
+            apply(cur)
+            cur.execute(f"PRAGMA {schema}.user_version = {step}")
+    return version != target
+
 
-    # --- Departments Table ---
+def _create_base_tables(cur):
+    """Version 1: departments, team leaders, clients, products, movements and progress."""
     cur.execute("""
         CREATE TABLE IF NOT EXISTS departments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,113 +862,313 @@ def init_db():
             order_no INTEGER NOT NULL
         )
     """)
-
-    # --- Team Leaders Table ---
     cur.execute("""
         CREATE TABLE IF NOT EXISTS team_leaders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
+            name TEXT UNIQUE NOT NULL,
+            department_id INTEGER,
+            FOREIGN KEY(department_id) REFERENCES departments(id)
         )
     """)
-
-    # ✅ Ensure 'department_id' column exists in team_leaders
-    cur.execute("PRAGMA table_info(team_leaders)")
-    columns = [col[1] for col in cur.fetchall()]
-    if "department_id" not in columns:
-        print("🧩 Adding missing 'department_id' column to team_leaders...")
+    if _column_info("team_leaders", "department_id") is None:
+        # Team leaders tables from before departments could be assigned
         cur.execute("ALTER TABLE team_leaders ADD COLUMN department_id INTEGER")
-        conn.commit()
 
-    # --- Clients Table ---
+    cur.execute(CLIENTS_TABLE_SQL.format(name="clients"))
+    cur.execute(PRODUCTS_TABLE_SQL.format(name="products"))
+    cur.execute(MOVEMENTS_TABLE_SQL.format(name="product_movements"))
+    cur.execute(PROGRESS_TABLE_SQL.format(name="progress"))
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_departments_order ON departments (order_no)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_team_leaders_department ON team_leaders (department_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_products_department ON products (department_id)")
+    _create_movement_indexes(cur)
+
+    cur.execute("SELECT COUNT(*) FROM departments")
+    if cur.fetchone()[0] == 0:
+        default_departments = [
+            ("Design", 1),
+            ("Fabrication", 2),
+            ("Panel Assembly", 3),
+            ("Dispatch", 4)
+        ]
+        cur.executemany("INSERT INTO departments (name, order_no) VALUES (?, ?)", default_departments)
+        print("🏢 Default departments added.")
+
+
+def _create_movement_indexes(cur):
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS clients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
+        CREATE INDEX IF NOT EXISTS idx_product_movements_product_time
+        ON product_movements (product_id, timestamp)
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_product_movements_time ON product_movements (timestamp)")
+
+
+def _add_client_summary(cur):
+    """Version 2: per-client counters, kept current by triggers."""
+    # Products still keyed by client name get their summary from version 6
+    if _column_info("products", "client") is None:
+        _create_client_summary(cur)
+
+
+def _create_client_summary(cur):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'client_summary'")
+    summary_exists = cur.fetchone() is not None
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS client_summary (
+            client_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            pipeline INTEGER NOT NULL DEFAULT 0
         )
     """)
+    if not summary_exists:
+        cur.execute(CLIENT_SUMMARY_REBUILD_SQL)
 
-    # --- Products Table ---
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            client TEXT NOT NULL,
-            completion_date TEXT NOT NULL,
-            department_id INTEGER,
-            status TEXT DEFAULT 'In Progress',
-            FOREIGN KEY(department_id) REFERENCES departments(id)
+        CREATE TRIGGER IF NOT EXISTS trg_client_summary_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO client_summary (client_id, total, completed, pipeline)
+            VALUES (NEW.client_id, 1,
+                    CASE WHEN NEW.status = 'Completed' THEN 1 ELSE 0 END,
+                    CASE WHEN NEW.status != 'Completed' THEN 1 ELSE 0 END)
+            ON CONFLICT(client_id) DO UPDATE SET
+                total = total + 1,
+                completed = completed + excluded.completed,
+                pipeline = pipeline + excluded.pipeline;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_client_summary_delete
+        AFTER DELETE ON products
+        BEGIN
+            UPDATE client_summary SET
+                total = total - 1,
+                completed = completed - CASE WHEN OLD.status = 'Completed' THEN 1 ELSE 0 END,
+                pipeline = pipeline - CASE WHEN OLD.status != 'Completed' THEN 1 ELSE 0 END
+            WHERE client_id = OLD.client_id;
+            DELETE FROM client_summary WHERE client_id = OLD.client_id AND total <= 0;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_client_summary_update
+        AFTER UPDATE OF client_id, status ON products
+        WHEN OLD.client_id IS NOT NEW.client_id OR OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE client_summary SET
+                total = total - 1,
+                completed = completed - CASE WHEN OLD.status = 'Completed' THEN 1 ELSE 0 END,
+                pipeline = pipeline - CASE WHEN OLD.status != 'Completed' THEN 1 ELSE 0 END
+            WHERE client_id = OLD.client_id;
+            DELETE FROM client_summary WHERE client_id = OLD.client_id AND total <= 0;
+            INSERT INTO client_summary (client_id, total, completed, pipeline)
+            VALUES (NEW.client_id, 1,
+                    CASE WHEN NEW.status = 'Completed' THEN 1 ELSE 0 END,
+                    CASE WHEN NEW.status != 'Completed' THEN 1 ELSE 0 END)
+            ON CONFLICT(client_id) DO UPDATE SET
+                total = total + 1,
+                completed = completed + excluded.completed,
+                pipeline = pipeline + excluded.pipeline;
+        END
+    """)
+
+
+def _create_analytics_tables(cur):
+    """Version 3: dwell and throughput rollups, filled incrementally by models/analytics.py."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_movement_id INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO analytics_state (id, last_movement_id) VALUES (1, 0)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dwell_stats (
+            department_id INTEGER PRIMARY KEY,
+            visits INTEGER NOT NULL DEFAULT 0,
+            total_seconds REAL NOT NULL DEFAULT 0,
+            max_seconds REAL NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_throughput (
+            day TEXT PRIMARY KEY,
+            completed INTEGER NOT NULL DEFAULT 0,
+            total_cycle_seconds REAL NOT NULL DEFAULT 0
         )
     """)
 
-    # --- Product Movements Table ---
+
+def _create_checkpoint_tables(cur):
+    """Version 4: periodic per-product WIP snapshots, see models/snapshot.py."""
+    cur.execute(CHECKPOINTS_TABLE_SQL.format(name="wip_checkpoints"))
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS product_movements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+        CREATE TABLE IF NOT EXISTS wip_checkpoint_rows (
+            checkpoint_id INTEGER NOT NULL,
             product_id INTEGER NOT NULL,
             department_id INTEGER NOT NULL,
-            timestamp TEXT NOT NULL,
-            FOREIGN KEY(product_id) REFERENCES products(id),
-            FOREIGN KEY(department_id) REFERENCES departments(id)
-        )
+            PRIMARY KEY (checkpoint_id, product_id),
+            FOREIGN KEY(checkpoint_id) REFERENCES wip_checkpoints(id)
+        ) WITHOUT ROWID
     """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_wip_checkpoint_rows_product ON wip_checkpoint_rows (product_id)")
 
-    # ✅ Check if department_id is NOT NULL and fix it automatically
-    cur.execute("PRAGMA table_info(product_movements)")
-    columns = cur.fetchall()
-    dept_nullable = True
-    for col in columns:
-        if col[1] == "department_id":
-            dept_nullable = (col[3] == 0)  # 0 = NULL allowed, 1 = NOT NULL
 
-    if not dept_nullable:
-        print("🔧 Fixing 'product_movements' table to allow NULL for department_id...")
+def _link_clients(cur):
+    """Version 6: indexes and summary keyed by client id, once products are rebuilt."""
+    _create_client_summary(cur)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_products_client_status ON products (client_id, status)")
+    # (client_id, rowid): keyset pages of one client without sorting all of its products
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_products_client ON products (client_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_products_department ON products (department_id)")
 
-        # 1️⃣ Create new temp table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS product_movements_temp (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id INTEGER NOT NULL,
-                department_id INTEGER,
-                timestamp TEXT NOT NULL,
-                FOREIGN KEY(product_id) REFERENCES products(id),
-                FOREIGN KEY(department_id) REFERENCES departments(id)
-            )
-        """)
 
-        # 2️⃣ Copy existing data
+def _create_search_index(cur):
+    """Version 7: FTS5 index over product name and client, see Product.search."""
+    # The rowid is the product id. Prefix indexes on 1-3 characters keep
+    # autocomplete on short input from expanding thousands of terms.
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+    search_exists = cur.fetchone() is not None
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+        USING fts5(name, client, prefix = '1 2 3')
+    """)
+    if not search_exists:
         cur.execute("""
-            INSERT INTO product_movements_temp (product_id, department_id, timestamp)
-            SELECT product_id, department_id, timestamp FROM product_movements
+            INSERT INTO products_fts (rowid, name, client)
+            SELECT p.id, p.name, c.name
+            FROM products p
+            JOIN clients c ON c.id = p.client_id
         """)
 
-        # 3️⃣ Drop old table and rename new one
-        cur.execute("DROP TABLE product_movements")
-        cur.execute("ALTER TABLE product_movements_temp RENAME TO product_movements")
-        print("✅ 'department_id' column in product_movements now allows NULL.")
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO products_fts (rowid, name, client)
+            VALUES (NEW.id, NEW.name, (SELECT name FROM clients WHERE id = NEW.client_id));
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_delete
+        AFTER DELETE ON products
+        BEGIN
+            DELETE FROM products_fts WHERE rowid = OLD.id;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_update
+        AFTER UPDATE OF name, client_id ON products
+        WHEN OLD.name IS NOT NEW.name OR OLD.client_id IS NOT NEW.client_id
+        BEGIN
+            UPDATE products_fts
+            SET name = NEW.name, client = (SELECT name FROM clients WHERE id = NEW.client_id)
+            WHERE rowid = NEW.id;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_client_rename
+        AFTER UPDATE OF name ON clients
+        WHEN OLD.name IS NOT NEW.name
+        BEGIN
+            UPDATE products_fts SET client = NEW.name
+            WHERE rowid IN (SELECT id FROM products WHERE client_id = NEW.id);
+        END
+    """)
+
+
+def _add_dwell_spread(cur):
+    """Version 8: sum of squared dwell times, for the spread used by Analytics.forecast_deadlines."""
+    if _column_info("dwell_stats", "total_sq_seconds") is None:
+        cur.execute("ALTER TABLE dwell_stats ADD COLUMN total_sq_seconds REAL NOT NULL DEFAULT 0")
+        # Recomputed from the whole movement log by the next Analytics.refresh()
+        cur.execute("DELETE FROM dwell_stats")
+        cur.execute("DELETE FROM daily_throughput")
+        cur.execute("UPDATE analytics_state SET last_movement_id = 0")
 
-    # --- Progress Table ---
+
+def _create_progress_index(cur):
+    """Version 9: progress rows by product, so deletes and orphan purges can find them."""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_progress_product ON progress (product_id)")
+
+
+# Change-feed entity per table, with the columns whose changes are logged
+CHANGE_FEED_TABLES = {
+    "products": ("product", ("name", "client_id", "completion_date", "department_id", "status")),
+    "departments": ("department", ("name", "order_no")),
+    "team_leaders": ("team_leader", ("name", "department_id")),
+}
+
+
+def _create_change_log(cur):
+    """Version 10: change_log filled by triggers, see models/change_feed.py."""
+    # AUTOINCREMENT: a seq is never reused, even after the newest rows are pruned
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS progress (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            progress INTEGER DEFAULT 0,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(product_id) REFERENCES products(id)
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at INTEGER NOT NULL DEFAULT """ + NOW_US_SQL + """
         )
     """)
+    for table, (entity, columns) in CHANGE_FEED_TABLES.items():
+        for op, row in (("insert", "NEW"), ("delete", "OLD")):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_change_{op}
+                AFTER {op.upper()} ON {table}
+                BEGIN
+                    INSERT INTO change_log (entity, entity_id, op) VALUES ('{entity}', {row}.id, '{op}');
+                END
+            """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_change_update
+            AFTER UPDATE OF {", ".join(columns)} ON {table}
+            WHEN {" OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)}
+            BEGIN
+                INSERT INTO change_log (entity, entity_id, op) VALUES ('{entity}', NEW.id, 'update');
+            END
+        """)
 
-    # ✅ Insert default departments if none exist
-    cur.execute("SELECT COUNT(*) FROM departments")
-    if cur.fetchone()[0] == 0:
-        default_departments = [
-            ("Design", 1),
-            ("Fabrication", 2),
-            ("Panel Assembly", 3),
-            ("Dispatch", 4)
-        ]
-        cur.executemany("INSERT INTO departments (name, order_no) VALUES (?, ?)", default_departments)
-        print("🏢 Default departments added.")
 
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized and upgraded successfully.")
+MIGRATIONS = (
+    (1, "base tables", None, _create_base_tables),
+    (2, "client summary", None, _add_client_summary),
+    (3, "analytics tables", None, _create_analytics_tables),
+    (4, "WIP checkpoints", None, _create_checkpoint_tables),
+    (5, "epoch-microsecond times", _migrate_timestamps, _create_movement_indexes),
+    (6, "client ids", _migrate_clients, _link_clients),
+    (7, "product search index", None, _create_search_index),
+    (8, "dwell time spread", None, _add_dwell_spread),
+    (9, "progress index", None, _create_progress_index),
+    (10, "change feed", None, _create_change_log),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def _create_archive_tables(cur):
+    cur.execute(ARCHIVE_PRODUCTS_TABLE_SQL.format(name="archive.products"))
+    cur.execute(ARCHIVE_MOVEMENTS_TABLE_SQL.format(name="archive.product_movements"))
+
+
+def _create_archive_movement_index(cur):
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS archive.idx_archive_movements_product_time
+        ON product_movements (product_id, timestamp)
+    """)
+
+
+def _create_archive_client_index(cur):
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS archive.idx_archive_products_client_status
+        ON products (client_id, status)
+    """)
+
+
+# Applied by archive_attached() against the archive's own user_version.
+ARCHIVE_MIGRATIONS = (
+    (1, "archive tables", None, _create_archive_tables),
+    (2, "epoch-microsecond times", _migrate_archive_timestamps, _create_archive_movement_index),
+    (3, "client ids", _migrate_archive_clients, _create_archive_client_index),
+)
@@ -0,0 +1,143 @@
+"""Seeded synthetic data generator for benchmarking and demos.
+
+Builds a realistic tracking database: clients with a long-tailed order
+volume, products arriving steadily over a period, and movement histories
+with department-specific dwell times (log-normal, so most units pass
+quickly and a few get stuck). Rows are written in bulk with executemany,
+movements in chronological order so ids and timestamps agree, as they do
+on a live floor.
+
+    python datagen.py bench.db --products 100000 --seed 42
+"""
+import heapq
+import io
+import os
+import random
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import click
+
+import database
+
+PRODUCT_TYPES = ["Control Panel", "Switchboard", "MCC Panel", "Distribution Board",
+                 "Junction Box", "Feeder Pillar", "PLC Cabinet", "Capacitor Bank"]
+
+
+def _product_events(rng, start, chain, dwell_hours, now):
+    """Return the (timestamp, department_id) movements of one product.
+
+    The product enters the first department at `start` and advances after a
+    random dwell in each. A final (timestamp, None) marks completion. Events
+    that would fall after `now` are not generated, leaving the product in
+    progress.
+    """
+    events = [(start, chain[0])]
+    t = start
+    for i, dept_id in enumerate(chain):
+        t += timedelta(hours=rng.lognormvariate(0, 0.6) * dwell_hours[dept_id])
+        if t > now:
+            break
+        events.append((t, chain[i + 1] if i + 1 < len(chain) else None))
+    return events
+
+
+def generate(path, products=10_000, clients=50, days=365, seed=42, batch_size=10_000):
+    """Create a new database at `path` filled with synthetic data.
+
+    Returns (products written, movements written). Raises FileExistsError if
+    `path` already exists, so a real database is never touched.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+
+    rng = random.Random(seed)
+    original_db = database.DB_NAME
+    database.DB_NAME = path
+    try:
+        with redirect_stdout(io.StringIO()):
+            database.init_db()
+        conn = database.get_connection()
+        chain = [row[0] for row in conn.execute("SELECT id FROM departments ORDER BY order_no")]
+        dwell_hours = {dept_id: rng.uniform(4, 48) for dept_id in chain}
+
+        with database.transaction() as cur:
+            cur.executemany("INSERT INTO clients (name) VALUES (?)",
+                            ((f"Client {n:03d}",) for n in range(1, clients + 1)))
+        client_ids = [row[0] for row in conn.execute("SELECT id FROM clients ORDER BY id")]
+        client_weights = [1 / (n + 1) for n in range(clients)]
+
+        now = datetime.now().replace(microsecond=0)
+        start = now - timedelta(days=days)
+        spacing = timedelta(days=days) / products
+
+        pending = []  # heap of (timestamp, product_id, department_id)
+        product_rows = []
+        movement_rows = []
+        movement_count = 0
+
+        def flush():
+            with database.transaction() as cur:
+                cur.executemany("""
+                    INSERT INTO products (id, name, client_id, completion_date, department_id, status)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, product_rows)
+                cur.executemany("""
+                    INSERT INTO product_movements (product_id, department_id, timestamp)
+                    VALUES (?, ?, ?)
+                """, movement_rows)
+            product_rows.clear()
+            movement_rows.clear()
+
+        for product_id in range(1, products + 1):
+            arrived = start + spacing * product_id
+            # Nothing generated later can be older than this arrival, so
+            # every pending movement before it can be written in order.
+            while pending and pending[0][0] <= arrived:
+                ts, pid, dept_id = heapq.heappop(pending)
+                movement_rows.append((pid, dept_id, database.to_us(ts)))
+
+            events = _product_events(rng, arrived, chain, dwell_hours, now)
+            for ts, dept_id in events:
+                heapq.heappush(pending, (ts, product_id, dept_id))
+            movement_count += len(events)
+
+            completed = events[-1][1] is None
+            last_department = chain[-1] if completed else events[-1][1]
+            due = (arrived + timedelta(days=rng.randint(14, 60))).date().isoformat()
+            product_rows.append((
+                product_id,
+                f"{rng.choice(PRODUCT_TYPES)} {product_id}",
+                rng.choices(client_ids, client_weights)[0],
+                due,
+                last_department,
+                "Completed" if completed else "In Progress",
+            ))
+            if len(product_rows) >= batch_size:
+                flush()
+
+        while pending:
+            ts, pid, dept_id = heapq.heappop(pending)
+            movement_rows.append((pid, dept_id, database.to_us(ts)))
+        flush()
+        conn.execute("ANALYZE")
+        return products, movement_count
+    finally:
+        database.close_connection()
+        database.DB_NAME = original_db
+
+
+@click.command()
+@click.argument("path")
+@click.option("--products", default=10_000, show_default=True)
+@click.option("--clients", default=50, show_default=True)
+@click.option("--days", default=365, show_default=True, help="Period the products arrive over.")
+@click.option("--seed", default=42, show_default=True)
+def main(path, products, clients, days, seed):
+    """Create a synthetic database at PATH."""
+    written, movements = generate(path, products, clients, days, seed)
+    click.echo(f"Wrote {written} products and {movements} movements to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import sqlite3
+from statistics import NormalDist
+from database import get_connection, transaction, archive_attached, now_us, to_us
+
+LIVE_MOVEMENTS = "main.product_movements"
+# Archived products never move again, so only a full rebuild needs this tier
+BOTH_TIERS = """(
+    SELECT id, product_id, department_id, timestamp FROM main.product_movements
+    UNION ALL
+    SELECT id, product_id, department_id, timestamp FROM archive.product_movements
+)"""
+
+
+class Analytics:
+    """Dwell time, cycle time, throughput, bottleneck and deadline-risk figures.
+
+    Figures are accumulated in dwell_stats and daily_throughput. refresh()
+    only processes movements logged since the last run, so re-running a
+    report costs time proportional to the new activity, not the whole log.
+    """
+
+    @staticmethod
+    def refresh(full=False):
+        """Fold movements recorded since the last run into the statistics.
+
+        Each product's movements are paired with the one before it using
+        LAG() over (product_id, timestamp), in a single set-based pass. A
+        movement closes the product's stay in the previous department, and
+        a completion (NULL department) closes its whole cycle. full=True
+        discards the accumulated figures and recomputes from the start,
+        including the movements of archived products. Archive.archive_completed
+        refreshes before it removes movements from the live tier.
+
+        Returns the number of movements processed.
+        """
+        if full:
+            with archive_attached(read_only=True) as conn:
+                return Analytics._fold(full, BOTH_TIERS if conn is not None else LIVE_MOVEMENTS)
+        return Analytics._fold(full, LIVE_MOVEMENTS)
+
+    @staticmethod
+    def _fold(full, movements):
+        with transaction() as cur:
+            if full:
+                cur.execute("DELETE FROM dwell_stats")
+                cur.execute("DELETE FROM daily_throughput")
+                cur.execute("UPDATE analytics_state SET last_movement_id = 0")
+
+            cur.execute("SELECT last_movement_id FROM analytics_state WHERE id = 1")
+            last_id = cur.fetchone()[0]
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {movements}")
+            up_to = cur.fetchone()[0]
+            if up_to <= last_id:
+                return 0
+
+            # Full histories of just the products that moved since last time,
+            # so LAG() can see the movement each new one follows.
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS new_movements (
+                    id INTEGER PRIMARY KEY,
+                    department_id INTEGER,
+                    timestamp INTEGER,
+                    prev_department_id INTEGER,
+                    dwell_seconds REAL,
+                    cycle_seconds REAL,
+                    has_prev INTEGER
+                )
+            """)
+            cur.execute(f"""
+                INSERT INTO temp.new_movements
+                SELECT * FROM (
+                    SELECT pm.id, pm.department_id, pm.timestamp,
+                        LAG(pm.department_id) OVER w AS prev_department_id,
+                        (pm.timestamp - LAG(pm.timestamp) OVER w) / 1e6 AS dwell_seconds,
+                        (pm.timestamp - FIRST_VALUE(pm.timestamp) OVER w) / 1e6 AS cycle_seconds,
+                        LAG(pm.id) OVER w IS NOT NULL AS has_prev
+                    FROM {movements} pm
+                    WHERE pm.product_id IN (
+                        SELECT product_id FROM {movements} WHERE id > ? AND id <= ?
+                    )
+                    WINDOW w AS (PARTITION BY pm.product_id ORDER BY pm.timestamp, pm.id)
+                )
+                WHERE id > ? AND id <= ?
+            """, (last_id, up_to, last_id, up_to))
+            processed = cur.rowcount
+
+            cur.execute("""
+                INSERT INTO dwell_stats (department_id, visits, total_seconds, total_sq_seconds, max_seconds)
+                SELECT prev_department_id, COUNT(*), SUM(dwell_seconds),
+                    SUM(dwell_seconds * dwell_seconds), MAX(dwell_seconds)
+                FROM temp.new_movements
+                WHERE has_prev AND prev_department_id IS NOT NULL
+                GROUP BY prev_department_id
+                ON CONFLICT(department_id) DO UPDATE SET
+                    visits = visits + excluded.visits,
+                    total_seconds = total_seconds + excluded.total_seconds,
+                    total_sq_seconds = total_sq_seconds + excluded.total_sq_seconds,
+                    max_seconds = MAX(max_seconds, excluded.max_seconds)
+            """)
+            cur.execute("""
+                INSERT INTO daily_throughput (day, completed, total_cycle_seconds)
+                SELECT date(timestamp / 1000000, 'unixepoch', 'localtime'), COUNT(*), SUM(cycle_seconds)
+                FROM temp.new_movements
+                WHERE department_id IS NULL
+                GROUP BY date(timestamp / 1000000, 'unixepoch', 'localtime')
+                ON CONFLICT(day) DO UPDATE SET
+                    completed = completed + excluded.completed,
+                    total_cycle_seconds = total_cycle_seconds + excluded.total_cycle_seconds
+            """)
+            cur.execute("UPDATE analytics_state SET last_movement_id = ? WHERE id = 1", (up_to,))
+            cur.execute("DELETE FROM temp.new_movements")
+
+        return processed
+
+    @staticmethod
+    def get_dwell_times():
+        """Return (department, visits, avg_hours, max_hours) in production order."""
+        cur = get_connection().execute("""
+            SELECT d.name, s.visits,
+                ROUND(s.total_seconds / s.visits / 3600, 2),
+                ROUND(s.max_seconds / 3600, 2)
+            FROM departments d
+            JOIN dwell_stats s ON s.department_id = d.id
+            ORDER BY d.order_no
+        """)
+        return cur.fetchall()
+
+    @staticmethod
+    def get_cycle_time():
+        """Return (completed products, average cycle time in hours)."""
+        cur = get_connection().execute("""
+            SELECT COALESCE(SUM(completed), 0),
+                ROUND(SUM(total_cycle_seconds) / SUM(completed) / 3600, 2)
+            FROM daily_throughput
+        """)
+        return cur.fetchone()
+
+    @staticmethod
+    def get_daily_throughput(days=14):
+        """Return (day, completed, avg_cycle_hours) for the most recent days."""
+        cur = get_connection().execute("""
+            SELECT day, completed, ROUND(total_cycle_seconds / completed / 3600, 2)
+            FROM daily_throughput
+            ORDER BY day DESC
+            LIMIT ?
+        """, (days,))
+        return cur.fetchall()
+
+    @staticmethod
+    def get_bottleneck():
+        """Return (department, avg_hours, wip) for the slowest department with work in it.
+
+        The bottleneck is where work currently waits longest on average, so
+        only departments that hold in-progress products are considered.
+        Returns None when there is not enough history yet.
+        """
+        cur = get_connection().execute("""
+            SELECT d.name, ROUND(s.total_seconds / s.visits / 3600, 2), w.wip
+            FROM dwell_stats s
+            JOIN departments d ON d.id = s.department_id
+            JOIN (
+                SELECT department_id, COUNT(*) AS wip
+                FROM products
+                WHERE status != 'Completed'
+                GROUP BY department_id
+            ) w ON w.department_id = s.department_id
+            ORDER BY s.total_seconds / s.visits DESC
+            LIMIT 1
+        """)
+        return cur.fetchone()
+
+    @staticmethod
+    def forecast_deadlines(min_risk=0.5, now=None, limit=None):
+        """Forecast when in-progress products will finish and flag likely late ones.
+
+        A product is expected to spend what is left of its current
+        department's average dwell (less the time it has already been
+        there), then the average dwell of each later department. Dwell
+        times are treated as independent and roughly normal, so the spread
+        of the finish time comes from the per-department variances in
+        dwell_stats. A product is late if it finishes after the end of its
+        completion_date.
+
+        The whole WIP is forecast in one statement. Call refresh() first so
+        the dwell figures include recent movements. `now` (datetime, ISO
+        text or epoch µs) defaults to the current time.
+
+        Returns (id, name, client, department, completion_date, expected
+        finish, chance of being late) for each product whose chance of
+        being late is at least `min_risk`, most at risk first. Products
+        whose completion_date is not a date (older rows) are left out.
+        """
+        # P(late) >= min_risk  <=>  (due - finish) / spread <= cutoff
+        cutoff = NormalDist().inv_cdf(1 - min(min_risk, 1 - 1e-9)) if min_risk > 0 else None
+        cur = get_connection().execute("""
+            WITH dwell AS (
+                SELECT d.id, d.order_no,
+                    COALESCE(s.total_seconds / s.visits, 0) AS mean,
+                    COALESCE(MAX(s.total_sq_seconds / s.visits
+                                 - (s.total_seconds / s.visits) * (s.total_seconds / s.visits), 0), 0) AS var
+                FROM departments d
+                LEFT JOIN dwell_stats s ON s.department_id = d.id
+            ),
+            route AS (
+                SELECT id, mean, var,
+                    COALESCE(SUM(mean) OVER later, 0) AS mean_after,
+                    COALESCE(SUM(var) OVER later, 0) AS var_after
+                FROM dwell
+                WINDOW later AS (ORDER BY order_no ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING)
+            ),
+            forecast AS (
+                SELECT p.id, p.name, p.client_id, p.department_id, p.completion_date,
+                    :now + (MAX(r.mean - (:now - COALESCE(
+                        (SELECT MAX(pm.timestamp) FROM product_movements pm WHERE pm.product_id = p.id),
+                        :now)) / 1e6, 0) + r.mean_after) * 1e6 AS finish,
+                    SQRT(r.var + r.var_after) * 1e6 AS spread,
+                    (julianday(p.completion_date, '+1 day', 'utc') - 2440587.5) * 86400e6 AS due
+                FROM route r
+                JOIN products p ON p.department_id = r.id
+                WHERE p.status != 'Completed'
+            ),
+            scored AS (
+                SELECT *,
+                    CASE WHEN spread > 0 THEN (due - finish) / spread
+                         WHEN finish > due THEN -1e9
+                         ELSE 1e9 END AS z
+                FROM forecast
+            )
+            SELECT f.id, f.name, c.name, d.name, f.completion_date,
+                strftime('%Y-%m-%dT%H:%M:%S', f.finish / 1e6, 'unixepoch', 'localtime'), f.z
+            FROM scored f
+            JOIN clients c ON c.id = f.client_id
+            JOIN departments d ON d.id = f.department_id
+            WHERE f.due IS NOT NULL AND (:cutoff IS NULL OR f.z <= :cutoff)
+            ORDER BY f.z, f.id
+            LIMIT :limit
+        """, {"now": now_us() if now is None else to_us(now), "cutoff": cutoff,
+              "limit": -1 if limit is None else limit})
+        late = NormalDist().cdf
+        return [(*row[:6], round(late(-row[6]), 3)) for row in cur]
@@ -0,0 +1,113 @@
+import sqlite3
+from database import transaction, archive_attached, to_us
+from models.analytics import Analytics
+
+
+class Archive:
+    """Moves finished work out of the live database into the archive tier."""
+
+    @staticmethod
+    def archive_completed(before, batch_size=500, progress=None):
+        """Archive completed products whose completion was logged before `before`.
+
+        `before` is an ISO date or timestamp (e.g. "2025-01-01"). Products
+        and all their movements are copied to the archive database and then
+        removed from the live one, one batch per transaction, so the write
+        lock is never held for long. `progress`, if given, is called with
+        the running total after each batch. Analytics are refreshed before
+        each batch leaves the live tier, so its movements stay counted.
+
+        Returns the number of products archived.
+        """
+        before = to_us(before)
+        archived = 0
+        last_id = 0
+        with archive_attached():
+            while True:
+                # Main is in WAL mode and the archive is not, so SQLite cannot
+                # commit one transaction across both files atomically. Copy the
+                # batch and commit the archive first, then remove from live only
+                # what the archive holds. A crash in between leaves the batch in
+                # both tiers; the next run copies it again (OR REPLACE) and
+                # finishes the removal, so rows are never lost.
+                with transaction() as cur:
+                    cur.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (product_id INTEGER PRIMARY KEY)")
+                    cur.execute("DELETE FROM temp.archive_batch")
+                    cur.execute("""
+                        INSERT INTO temp.archive_batch (product_id)
+                        SELECT p.id
+                        FROM products p
+                        WHERE p.id > ? AND p.status = 'Completed'
+                          AND EXISTS (
+                              SELECT 1 FROM product_movements pm
+                              WHERE pm.product_id = p.id
+                                AND pm.department_id IS NULL
+                                AND pm.timestamp < ?
+                          )
+                        ORDER BY p.id
+                        LIMIT ?
+                    """, (last_id, before, batch_size))
+                    count = cur.rowcount
+                    if count == 0:
+                        break
+                    cur.execute("SELECT MAX(product_id) FROM temp.archive_batch")
+                    last_id = cur.fetchone()[0]
+
+                    cur.execute("""
+                        INSERT OR REPLACE INTO archive.products
+                            (id, name, client_id, completion_date, department_id, status)
+                        SELECT id, name, client_id, completion_date, department_id, status
+                        FROM products
+                        WHERE id IN (SELECT product_id FROM temp.archive_batch)
+                    """)
+                    cur.execute("""
+                        INSERT OR REPLACE INTO archive.product_movements
+                            (id, product_id, department_id, timestamp)
+                        SELECT id, product_id, department_id, timestamp
+                        FROM product_movements
+                        WHERE product_id IN (SELECT product_id FROM temp.archive_batch)
+                    """)
+
+                # Fold the batch's movements into the statistics while they are still live
+                Analytics.refresh()
+                with transaction() as cur:
+                    # Only what the committed archive copy holds
+                    cur.execute("""
+                        DELETE FROM temp.archive_batch
+                        WHERE product_id NOT IN (SELECT id FROM archive.products)
+                    """)
+                    cur.execute("""
+                        DELETE FROM product_movements
+                        WHERE product_id IN (SELECT product_id FROM temp.archive_batch)
+                          AND id IN (SELECT id FROM archive.product_movements)
+                    """)
+                    cur.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+                    last_seq = cur.fetchone()[0]
+                    cur.execute("DELETE FROM products WHERE id IN (SELECT product_id FROM temp.archive_batch)")
+                    # The delete trigger logged these as deletes; they still exist, in the archive
+                    cur.execute("""
+                        UPDATE change_log SET op = 'archive'
+                        WHERE seq > ? AND entity = 'product' AND op = 'delete'
+                    """, (last_seq,))
+                    cur.execute("DELETE FROM progress WHERE product_id IN (SELECT product_id FROM temp.archive_batch)")
+                    # Their later movements are gone from this tier, so live WIP
+                    # snapshots must stop counting them from old checkpoints.
+                    cur.execute("""
+                        DELETE FROM wip_checkpoint_rows
+                        WHERE product_id IN (SELECT product_id FROM temp.archive_batch)
+                    """)
+                    cur.execute("DELETE FROM temp.archive_batch")
+
+                archived += count
+                if progress:
+                    progress(archived)
+
+        return archived
+
+    @staticmethod
+    def get_archived_count():
+        """Return the number of products held in the archive (0 if there is none yet)."""
+        with archive_attached(read_only=True) as conn:
+            if conn is None:
+                return 0
+            return conn.execute("SELECT COUNT(*) FROM archive.products").fetchone()[0]
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+from database import get_connection, transaction, format_us, to_us
+
+PAGE_SIZE = 500
+
+
+class CursorExpired(ValueError):
+    """The changes after a cursor have been pruned; the consumer must re-read everything."""
+
+
+class ChangeFeed:
+    """Product, department and team-leader changes in commit order, for incremental consumers.
+
+    Triggers append one change_log row per insert, update or delete. Its
+    seq is the cursor: SQLite has a single writer, so seqs are handed out
+    in commit order and a change committed after a reader saw seq N always
+    gets a seq above N. A consumer keeps the last seq it processed and asks
+    for what came after it; a new consumer calls get_cursor() first, reads
+    the current state, then follows the feed from that cursor. Rows only
+    name what changed; read the entity itself for its current values.
+    A product moved to the archive tier by Archive.archive_completed is
+    logged with op 'archive', not 'delete': it is gone from the live
+    tables but still exists, so consumers should not treat it as removed.
+    """
+
+    @staticmethod
+    def get_cursor():
+        """Return the seq of the newest change (0 if there has been none)."""
+        cur = get_connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def get_changes(after=0, limit=PAGE_SIZE):
+        """Return up to `limit` changes after seq `after`, oldest first.
+
+        Each change is (seq, entity, entity_id, op, changed_at) with op one
+        of insert/update/delete/archive and changed_at as local ISO time. Pass the
+        last seq back as `after` for the next page. Raises CursorExpired if
+        changes after `after` were pruned.
+        """
+        conn = get_connection()
+        rows = conn.execute("""
+            SELECT seq, entity, entity_id, op, changed_at
+            FROM change_log
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+        """, (after, limit)).fetchall()
+        if (not rows or rows[0][0] != after + 1) and after < ChangeFeed._pruned_through(conn):
+            raise CursorExpired(f"Changes after {after} have been pruned; re-read everything "
+                                "and continue from get_cursor().")
+        return [(seq, entity, entity_id, op, format_us(ts)) for seq, entity, entity_id, op, ts in rows]
+
+    @staticmethod
+    def _pruned_through(conn):
+        """Seq of the newest pruned change (0 if none were)."""
+        oldest = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+        if oldest is None:
+            return ChangeFeed.get_cursor()
+        return oldest - 1
+
+    @staticmethod
+    def wait_for_changes(after=0, timeout=30.0, limit=PAGE_SIZE, poll_interval=0.2):
+        """Like get_changes, but wait up to `timeout` seconds for the first change.
+
+        Between checks it only reads PRAGMA data_version, which moves when
+        another connection commits, so an idle wait costs no queries on
+        change_log. Returns [] if nothing changed in time.
+        """
+        conn = get_connection()
+        deadline = time.monotonic() + timeout
+        while True:
+            # Read the version first, so a commit during get_changes is not missed
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            changes = ChangeFeed.get_changes(after, limit)
+            if changes:
+                return changes
+            while conn.execute("PRAGMA data_version").fetchone()[0] == version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                time.sleep(min(poll_interval, remaining))
+
+    @staticmethod
+    def prune(before, batch_size=5000):
+        """Delete changes logged before `before` (ISO date or timestamp), oldest first.
+
+        One batch per transaction. Consumers whose cursor falls in the
+        pruned range get CursorExpired. Returns the number of rows deleted.
+        """
+        before = to_us(before)
+        pruned = 0
+        while True:
+            with transaction() as cur:
+                cur.execute("""
+                    DELETE FROM change_log
+                    WHERE seq IN (SELECT seq FROM change_log ORDER BY seq LIMIT ?)
+                      AND changed_at < ?
+                """, (batch_size, before))
+                count = cur.rowcount
+            pruned += count
+            # The log is in time order, so a partly deleted batch reached the cutoff
+            if count < batch_size:
+                return pruned
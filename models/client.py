@@ -0,0 +1,131 @@
+import sqlite3
+from database import (get_connection, transaction, archive_attached, cached,
+                      normalize_client_name, CLIENT_SUMMARY_REBUILD_SQL)
+
+
+class Client:
+    """Clients, and per-client product counters kept current by triggers on products."""
+
+    @staticmethod
+    def get_ids():
+        """Return a cached {name: client_id} map, reloaded after any change."""
+        def load():
+            return dict(get_connection().execute("SELECT name, id FROM clients ORDER BY name").fetchall())
+
+        return cached("client_ids", load)
+
+    @staticmethod
+    def get_id(name):
+        """Return the id of client `name` (any case or spacing), or None."""
+        name = normalize_client_name(name)
+        client_id = Client.get_ids().get(name)
+        if client_id is None:
+            row = get_connection().execute("SELECT id FROM clients WHERE name = ?", (name,)).fetchone()
+            client_id = row[0] if row else None
+        return client_id
+
+    @staticmethod
+    def intern(cur, names):
+        """Return {name: client_id} for `names`, adding clients that are new.
+
+        Runs on the caller's transaction cursor, so new clients commit or
+        roll back with the products that reference them. Call
+        bump_generation() after the commit if the result reports new ones
+        (the second item of the returned pair).
+        """
+        ids = {}
+        added = False
+        known = Client.get_ids()
+        for name in names:
+            if name in ids:
+                continue
+            clean = normalize_client_name(name)
+            client_id = known.get(clean)
+            if client_id is None:
+                cur.execute("SELECT id FROM clients WHERE name = ?", (clean,))
+                row = cur.fetchone()
+                if row:
+                    client_id = row[0]
+                else:
+                    cur.execute("INSERT INTO clients (name) VALUES (?)", (clean,))
+                    client_id = cur.lastrowid
+                    added = True
+            ids[name] = client_id
+        return ids, added
+
+    @staticmethod
+    def get_summary(include_archived=False):
+        """Return (client, total, completed, pipeline) for every client.
+
+        Reads the client_summary table, so the cost grows with the number
+        of clients rather than the number of products. The counters cover
+        live products only; include_archived=True adds the archive tier,
+        attached read-only. Without an archive file only live products count.
+        """
+        if not include_archived:
+            cur = get_connection().execute("""
+                SELECT c.name, s.total, s.completed, s.pipeline
+                FROM client_summary s
+                JOIN clients c ON c.id = s.client_id
+                ORDER BY c.name
+            """)
+            return cur.fetchall()
+
+        with archive_attached(read_only=True) as conn:
+            if conn is None:
+                return Client.get_summary()
+            cur = conn.execute("""
+                SELECT c.name, SUM(s.total), SUM(s.completed), SUM(s.pipeline)
+                FROM (
+                    SELECT client_id, total, completed, pipeline FROM main.client_summary
+                    UNION ALL
+                    SELECT client_id,
+                        COUNT(*),
+                        SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END),
+                        SUM(CASE WHEN status != 'Completed' THEN 1 ELSE 0 END)
+                    FROM archive.products
+                    GROUP BY client_id
+                ) s
+                JOIN main.clients c ON c.id = s.client_id
+                GROUP BY s.client_id
+                ORDER BY c.name
+            """)
+            return cur.fetchall()
+
+    @staticmethod
+    def rebuild_summary():
+        """Recompute client_summary from products. Returns the number of clients."""
+        with transaction() as cur:
+            cur.execute("DELETE FROM client_summary")
+            cur.execute(CLIENT_SUMMARY_REBUILD_SQL)
+            cur.execute("SELECT COUNT(*) FROM client_summary")
+            return cur.fetchone()[0]
+
+    @staticmethod
+    def verify_summary():
+        """Compare client_summary against a full recount of products.
+
+        Returns a list of (client, expected, stored) tuples for every client
+        whose counters drifted, where expected and stored are
+        (total, completed, pipeline) tuples (None when the row is missing).
+        """
+        cur = get_connection().execute("""
+            SELECT c.name, p.total, p.completed, p.pipeline
+            FROM (
+                SELECT client_id,
+                    COUNT(*) AS total,
+                    SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) AS completed,
+                    SUM(CASE WHEN status != 'Completed' THEN 1 ELSE 0 END) AS pipeline
+                FROM products
+                GROUP BY client_id
+            ) p
+            JOIN clients c ON c.id = p.client_id
+        """)
+        expected = {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+        stored = {row[0]: tuple(row[1:]) for row in Client.get_summary()}
+
+        return [
+            (client, expected.get(client), stored.get(client))
+            for client in sorted(expected.keys() | stored.keys())
+            if expected.get(client) != stored.get(client)
+        ]
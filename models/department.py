@@ -1,82 +1,85 @@
 import sqlite3
-from database import get_connection
+from database import get_connection, transaction, cached, bump_generation
 
 
-class Department:
-    @staticmethod
-    def create_table():
-        """Create departments table if not exists."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS departments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            order_no INTEGER NOT NULL
-        )
-        """)
-        conn.commit()
-        conn.close()
+class DepartmentSequence:
+    """Departments in production order, with O(1) lookups by id and name."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_id = {row[0]: row for row in rows}
+        self.by_name = {row[1]: row for row in rows}
+        # Each department's id -> the department that follows it (None for the last)
+        self.next_by_id = {row[0]: nxt for row, nxt in zip(rows, rows[1:] + [None])}
+        self.first = rows[0] if rows else None
 
+
+class Department:
     @staticmethod
     def get_all_departments():
         """Return all departments ordered by order_no."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, order_no FROM departments ORDER BY order_no")
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        return list(Department.get_sequence().rows)
 
     @staticmethod
-    def add_department(name, before_name):
-        """Add a new department in a specific order."""
-        conn = get_connection()
-        cur = conn.cursor()
+    def get_sequence():
+        """Return the cached DepartmentSequence, reloading it after any change."""
+        def load():
+            cur = get_connection().execute("SELECT id, name, order_no FROM departments ORDER BY order_no")
+            return DepartmentSequence(cur.fetchall())
 
-        # Get all existing departments
-        cur.execute("SELECT id, name, order_no FROM departments ORDER BY order_no")
-        departments = cur.fetchall()
-        names = [d[1] for d in departments]
+        return cached("departments", load)
 
-        if not departments:
-            # If no departments exist yet
-            cur.execute("INSERT INTO departments (name, order_no) VALUES (?, ?)", (name, 1))
-            conn.commit()
-            conn.close()
-            return True
+    @staticmethod
+    def add_department(name, before_name):
+        """Add a new department in a specific order."""
+        with transaction() as cur:
+            # Get all existing departments
+            cur.execute("SELECT id, name, order_no FROM departments ORDER BY order_no")
+            departments = cur.fetchall()
+            names = [d[1] for d in departments]
 
-        # If 'before_name' is given and exists
-        if before_name in names:
-            position = names.index(before_name)
-            # Shift order_no for departments that come after this position
-            cur.execute("UPDATE departments SET order_no = order_no + 1 WHERE order_no >= ?", (position + 1,))
-            cur.execute("INSERT INTO departments (name, order_no) VALUES (?, ?)", (name, position + 1))
-        else:
-            # Add at the end
-            cur.execute("SELECT MAX(order_no) FROM departments")
-            max_order = cur.fetchone()[0] or 0
-            cur.execute("INSERT INTO departments (name, order_no) VALUES (?, ?)", (name, max_order + 1))
+            if not departments:
+                # If no departments exist yet
+                cur.execute("INSERT INTO departments (name, order_no) VALUES (?, ?)", (name, 1))
+            elif before_name in names:
+                # If 'before_name' is given and exists
+                position = names.index(before_name)
+                # Shift order_no for departments that come after this position
+                cur.execute("UPDATE departments SET order_no = order_no + 1 WHERE order_no >= ?", (position + 1,))
+                cur.execute("INSERT INTO departments (name, order_no) VALUES (?, ?)", (name, position + 1))
+            else:
+                # Add at the end
+                cur.execute("SELECT MAX(order_no) FROM departments")
+                max_order = cur.fetchone()[0] or 0
+                cur.execute("INSERT INTO departments (name, order_no) VALUES (?, ?)", (name, max_order + 1))
 
-        conn.commit()
-        conn.close()
+        bump_generation()
         return True
 
     @staticmethod
     def delete_department(name):
-        """Delete a department by name and reorder sequence."""
-        conn = get_connection()
-        cur = conn.cursor()
+        """Delete a department by name and reorder sequence.
+
+        Refused while any product, in progress or completed, is still in the
+        department; its team leader is left unassigned.
+        """
+        with transaction() as cur:
+            cur.execute("SELECT id, order_no FROM departments WHERE name = ?", (name,))
+            result = cur.fetchone()
+            if not result:
+                return False
+
+            department_id, order_no = result
+            cur.execute("SELECT COUNT(*) FROM products WHERE department_id = ?", (department_id,))
+            count = cur.fetchone()[0]
+            if count:
+                print(f"⚠️ {count} product(s) are still in '{name}'. "
+                      "Move them on, or archive the completed ones, first.")
+                return False
 
-        cur.execute("SELECT order_no FROM departments WHERE name = ?", (name,))
-        result = cur.fetchone()
-        if not result:
-            conn.close()
-            return False
+            cur.execute("UPDATE team_leaders SET department_id = NULL WHERE department_id = ?", (department_id,))
+            cur.execute("DELETE FROM departments WHERE id = ?", (department_id,))
+            cur.execute("UPDATE departments SET order_no = order_no - 1 WHERE order_no > ?", (order_no,))
 
-        order_no = result[0]
-        cur.execute("DELETE FROM departments WHERE name = ?", (name,))
-        cur.execute("UPDATE departments SET order_no = order_no - 1 WHERE order_no > ?", (order_no,))
-        conn.commit()
-        conn.close()
+        bump_generation()
         return True
@@ -0,0 +1,118 @@
+import sqlite3
+from database import get_connection, transaction, bump_generation
+
+# Tables whose rows belong to a product and outlive it once the product is gone
+PRODUCT_TABLES = ("product_movements", "progress", "wip_checkpoint_rows")
+VACUUM_STEP_PAGES = 2000   # pages handed back per incremental_vacuum transaction (~8 MB)
+
+
+class Maintenance:
+    """Orphan cleanup, space reclamation and planner statistics for the live database."""
+
+    @staticmethod
+    def purge_orphans(batch_size=500, progress=None):
+        """Delete rows left behind by products that no longer exist.
+
+        Orphans are found by walking each table's product_id index outside
+        any transaction, then deleted `batch_size` products at a time, one
+        transaction per batch, so the write lock is never held for long.
+        `progress`, if given, is called with (table, rows deleted so far)
+        after each batch. Team leaders of deleted departments are
+        unassigned.
+
+        Returns {table: rows deleted}.
+        """
+        conn = get_connection()
+        purged = {}
+        for table in PRODUCT_TABLES:
+            purged[table] = 0
+            last_id = 0
+            while True:
+                ids = [row[0] for row in conn.execute(f"""
+                    SELECT DISTINCT t.product_id
+                    FROM {table} t
+                    WHERE t.product_id > ?
+                      AND NOT EXISTS (SELECT 1 FROM products p WHERE p.id = t.product_id)
+                    ORDER BY t.product_id
+                    LIMIT ?
+                """, (last_id, batch_size))]
+                if not ids:
+                    break
+                last_id = ids[-1]
+
+                with transaction() as cur:
+                    cur.execute(f"""
+                        DELETE FROM {table}
+                        WHERE product_id IN ({",".join("?" * len(ids))})
+                    """, ids)
+                    purged[table] += cur.rowcount
+                if progress:
+                    progress(table, purged[table])
+
+        with transaction() as cur:
+            cur.execute("""
+                UPDATE team_leaders SET department_id = NULL
+                WHERE department_id IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM departments d WHERE d.id = team_leaders.department_id)
+            """)
+            purged["team_leaders"] = cur.rowcount
+        if purged["team_leaders"]:
+            bump_generation()
+        return purged
+
+    @staticmethod
+    def get_products_in_missing_departments():
+        """Return (id, name, department_id) for products whose department was deleted.
+
+        They are only reported: which department they belong in is for a
+        person to decide.
+        """
+        cur = get_connection().execute("""
+            SELECT p.id, p.name, p.department_id
+            FROM products p
+            WHERE p.department_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM departments d WHERE d.id = p.department_id)
+            ORDER BY p.department_id, p.id
+        """)
+        return cur.fetchall()
+
+    @staticmethod
+    def get_space():
+        """Return (file bytes, free bytes) of the live database, excluding the WAL."""
+        conn = get_connection()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_count * page_size, free_pages * page_size
+
+    @staticmethod
+    def vacuum(step_pages=VACUUM_STEP_PAGES):
+        """Hand free pages back to the file system, a step at a time.
+
+        A database created before auto_vacuum was switched on is rebuilt
+        once with VACUUM, which holds the write lock for the whole copy;
+        after that, free pages are released by incremental_vacuum in steps
+        of `step_pages`, each its own short transaction. The WAL is then
+        checkpointed and truncated.
+
+        Returns the number of bytes reclaimed.
+        """
+        conn = get_connection()
+        before = Maintenance.get_space()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("🧱 Switching the database to incremental auto-vacuum (one-off full VACUUM)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            # execute() would free a single page; executescript() runs the pragma to the end
+            conn.executescript(f"PRAGMA incremental_vacuum({int(step_pages)})")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return before - Maintenance.get_space()[0]
+
+    @staticmethod
+    def optimize():
+        """Refresh the query planner's statistics, sampling large indexes."""
+        conn = get_connection()
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
@@ -1,45 +1,61 @@
 import sqlite3
-from database import get_connection
+from models.department import Department
 from models.product import Product
-from datetime import datetime
+
 
 class Movement:
-    @staticmethod
-    def move_product(name, to_department):
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT department FROM products WHERE name = ?", (name,))
-        result = cur.fetchone()
+    """Moves and history looked up by product name rather than id."""
 
-        if not result:
+    @staticmethod
+    def _find(name):
+        """Return the one product named `name`, printing why when there isn't one."""
+        matches = Product.find_by_name(name)
+        if not matches:
             print("❌ Product not found.")
-            conn.close()
-            return
-
-        from_department = result[0]
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            return None
+        if len(matches) > 1:
+            print(f"⚠️ {len(matches)} products are named '{name}'; use the product ID instead.")
+            return None
+        return matches[0]
 
-        cur.execute("""
-            INSERT INTO movements (product_name, from_department, to_department, timestamp)
-            VALUES (?, ?, ?, ?)
-        """, (name, from_department, to_department, timestamp))
+    @staticmethod
+    def move_product(name, to_department):
+        """Move the product named `name` into the department named `to_department`."""
+        product = Movement._find(name)
+        if not product:
+            return False
 
-        conn.commit()
-        conn.close()
+        sequence = Department.get_sequence()
+        department = sequence.by_name.get(to_department)
+        if not department:
+            print("❌ Department not found.")
+            return False
+        if product[5] == "Completed":
+            print("⚠️ Product is already Completed.")
+            return False
 
-        # Update department in products table
-        Product.update_department(name, to_department)
+        # Compare-and-swap against the department the product was found in
+        current = sequence.by_name.get(product[4])
+        if not Product.move_product(product[0], department[0],
+                                    expected_department_id=current[0] if current else None):
+            print("⚠️ Another station moved this product first; look it up and try again.")
+            return False
+        return True
 
     @staticmethod
     def get_history(product_name):
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT from_department, to_department, timestamp
-            FROM movements
-            WHERE product_name = ?
-            ORDER BY timestamp ASC
-        """, (product_name,))
-        history = cur.fetchall()
-        conn.close()
+        """Return (from_department, to_department, timestamp) for each move of a product.
+
+        from_department is None for the first entry and to_department is
+        None for the completion.
+        """
+        product = Movement._find(product_name)
+        if not product:
+            return []
+
+        history = []
+        previous = None
+        for department, timestamp in Product.get_product_history(product[0]):
+            history.append((previous, department, timestamp))
+            previous = department
         return history
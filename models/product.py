@@ -1,143 +1,475 @@
+import csv
+import json
+import re
 import sqlite3
-from datetime import datetime
-from database import get_connection
+from datetime import date
+from itertools import islice
+from database import get_connection, transaction, archive_attached, bump_generation, now_us, format_us
+from models.client import Client
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
 
 
 class Product:
     """Handles all product-related database operations."""
 
-    @staticmethod
-    def create_table():
-        """Create products table if it doesn't exist."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            client TEXT NOT NULL,
-            completion_date TEXT NOT NULL,
-            department_id INTEGER,
-            status TEXT DEFAULT 'In Progress',
-            FOREIGN KEY(department_id) REFERENCES departments(id)
-        )
-        """)
-        conn.commit()
-        conn.close()
-
-    # ------------------------------------------------------
     @staticmethod
     def add_product(name, client, completion_date, department_id):
-        """Add a new product to the database."""
-        conn = get_connection()
-        cur = conn.cursor()
-
+        """Add a new product to the database and return its id."""
         if not name or not client:
             print("⚠️ Product name and client are required.")
-            conn.close()
+            return False
+        try:
+            completion_date = Product.clean_completion_date(completion_date)
+        except ValueError as e:
+            print(f"⚠️ {e}")
             return False
 
-        cur.execute("""
-            INSERT INTO products (name, client, completion_date, department_id)
-            VALUES (?, ?, ?, ?)
-        """, (name, client, completion_date, department_id))
+        with transaction() as cur:
+            client_ids, new_client = Client.intern(cur, [client])
+            cur.execute("""
+                INSERT INTO products (name, client_id, completion_date, department_id)
+                VALUES (?, ?, ?, ?)
+            """, (name, client_ids[client], completion_date, department_id))
 
-        # Log product creation
-        cur.execute("""
-            INSERT INTO product_movements (product_id, department_id, timestamp)
-            VALUES ((SELECT MAX(id) FROM products), ?, ?)
-        """, (department_id, datetime.now().isoformat()))
+            # Log product creation
+            product_id = cur.lastrowid
+            cur.execute("""
+                INSERT INTO product_movements (product_id, department_id, timestamp)
+                VALUES (?, ?, ?)
+            """, (product_id, department_id, now_us()))
 
-        conn.commit()
-        conn.close()
-        return True
+        if new_client:
+            bump_generation()
+        return product_id
 
     # ------------------------------------------------------
     @staticmethod
-    def get_all_products():
-        """Return all products with department and status."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT p.id, p.name, p.client, p.completion_date, d.name, p.status
+    def add_products_bulk(rows, batch_size=500):
+        """Add many products, each with its creation movement, in batches.
+
+        `rows` is any iterable of dicts with name, client, completion_date
+        and an optional department name (defaults to the first department).
+        It is consumed lazily, so a file reader can stream straight into it.
+        Each batch is inserted with executemany in one transaction. Invalid
+        rows are skipped and reported without aborting the rest.
+
+        Returns (number of products added, list of (row number, error)).
+        """
+        cur = get_connection().execute("SELECT name, id FROM departments ORDER BY order_no")
+        departments = dict(cur.fetchall())
+        first_department = next(iter(departments.values()), None)
+
+        added = 0
+        errors = []
+        numbered = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(numbered, batch_size))
+            if not chunk:
+                break
+
+            batch = []
+            for row_no, row in chunk:
+                try:
+                    batch.append(Product.clean_import_row(row, departments, first_department))
+                except ValueError as e:
+                    errors.append((row_no, str(e)))
+
+            if batch:
+                Product._insert_batch(batch)
+                added += len(batch)
+
+        return added, errors
+
+    # ------------------------------------------------------
+    @staticmethod
+    def clean_import_row(row, departments, first_department):
+        """Validate one import record and return (name, client, completion_date, department_id).
+
+        `departments` maps department names to ids. Raises ValueError with
+        the reason the row is rejected.
+        """
+        if not isinstance(row, dict):
+            raise ValueError("row is not a record")
+        name = str(row.get("name") or "").strip()
+        client = str(row.get("client") or "").strip()
+        completion_date = str(row.get("completion_date") or "").strip()
+        department = str(row.get("department") or "").strip()
+        if not name or not client or not completion_date:
+            raise ValueError("name, client and completion_date are required")
+        completion_date = Product.clean_completion_date(completion_date)
+        if department and department not in departments:
+            raise ValueError(f"unknown department '{department}'")
+        department_id = departments[department] if department else first_department
+        return name, client, completion_date, department_id
+
+    # ------------------------------------------------------
+    @staticmethod
+    def clean_completion_date(value):
+        """Return `value` as YYYY-MM-DD text, or raise ValueError.
+
+        Deadline reports compare it with SQLite date functions, which
+        return NULL for anything else.
+        """
+        value = str(value).strip()
+        try:
+            if not ISO_DATE.fullmatch(value):
+                raise ValueError
+            date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"completion date '{value}' is not a date like 2025-12-31") from None
+        return value
+
+    # ------------------------------------------------------
+    @staticmethod
+    def _insert_batch(batch):
+        """Insert one batch of product rows and their creation movements."""
+        timestamp = now_us()
+        with transaction() as cur:
+            client_ids, new_clients = Client.intern(cur, [row[1] for row in batch])
+            cur.executemany("""
+                INSERT INTO products (name, client_id, completion_date, department_id)
+                VALUES (?, ?, ?, ?)
+            """, ((name, client_ids[client], completion_date, department_id)
+                  for name, client, completion_date, department_id in batch))
+
+            # The write lock is held for the whole transaction, so AUTOINCREMENT
+            # hands this batch a contiguous block of ids ending at the last one.
+            cur.execute("SELECT last_insert_rowid()")
+            first_id = cur.fetchone()[0] - len(batch) + 1
+            cur.executemany("""
+                INSERT INTO product_movements (product_id, department_id, timestamp)
+                VALUES (?, ?, ?)
+            """, ((first_id + i, row[3], timestamp) for i, row in enumerate(batch)))
+        if new_clients:
+            bump_generation()
+
+    # ------------------------------------------------------
+    @staticmethod
+    def read_import_file(path):
+        """Yield product records from a .csv or .jsonl file, one at a time.
+
+        CSV files need a header row (name, client, completion_date and
+        optionally department). JSONL files hold one object per line; lines
+        that are not valid JSON are yielded as None so the importer reports
+        them. Blank lines are skipped. A UTF-8 byte-order mark, which Excel
+        writes to "CSV UTF-8" files, is dropped.
+        """
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            if path.lower().endswith(".csv"):
+                yield from csv.DictReader(f)
+                return
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+    # ------------------------------------------------------
+    @staticmethod
+    def get_product(product_id):
+        """Return one product (same columns as get_all_products) or None."""
+        cur = get_connection().execute("""
+            SELECT p.id, p.name, c.name, p.completion_date, d.name, p.status
+            FROM products p
+            JOIN clients c ON c.id = p.client_id
+            LEFT JOIN departments d ON p.department_id = d.id
+            WHERE p.id = ?
+        """, (product_id,))
+        return cur.fetchone()
+
+    # ------------------------------------------------------
+    @staticmethod
+    def get_products_page(after_id=0, limit=50, client=None, status=None, department_id=None):
+        """Return up to `limit` products with id > after_id, in id order.
+
+        Keyset pagination: pass the last id of one page as after_id to get
+        the next, which is an index seek however deep into the table it is.
+        """
+        conditions = ["p.id > ?"]
+        params = [after_id]
+        if client is not None:
+            # An unknown client matches nothing (client_id = NULL)
+            conditions.append("p.client_id = ?")
+            params.append(Client.get_id(client))
+        if status is not None:
+            conditions.append("p.status = ?")
+            params.append(status)
+        if department_id is not None:
+            conditions.append("p.department_id = ?")
+            params.append(department_id)
+        params.append(limit)
+
+        cur = get_connection().execute(f"""
+            SELECT p.id, p.name, c.name, p.completion_date, d.name, p.status
             FROM products p
+            JOIN clients c ON c.id = p.client_id
             LEFT JOIN departments d ON p.department_id = d.id
+            WHERE {" AND ".join(conditions)}
             ORDER BY p.id
-        """)
+            LIMIT ?
+        """, params)
+        return cur.fetchall()
+
+    # ------------------------------------------------------
+    @staticmethod
+    def _search_terms(text):
+        """Split text into words the way the FTS5 tokenizer does."""
+        return re.findall(r"[^\W_]+", text or "")
+
+    @staticmethod
+    def search(query, limit=10):
+        """Find products whose name or client contains words starting with `query`'s words.
+
+        "pan 12" matches "Control Panel 1203". Every word must match.
+        Backed by the products_fts index and returned newest first, with
+        the same columns as get_products_page. A query that is a product
+        id also returns that product, first.
+        """
+        terms = Product._search_terms(query)
+        if not terms:
+            return []
+
+        exact = Product.get_product(int(query)) if query.strip().isdecimal() else None
+        cur = get_connection().execute("""
+            SELECT p.id, p.name, c.name, p.completion_date, d.name, p.status
+            FROM products_fts f
+            JOIN products p ON p.id = f.rowid
+            JOIN clients c ON c.id = p.client_id
+            LEFT JOIN departments d ON p.department_id = d.id
+            WHERE products_fts MATCH ?
+            ORDER BY f.rowid DESC
+            LIMIT ?
+        """, (" ".join(f'"{term}"*' for term in terms), limit))
         rows = cur.fetchall()
-        conn.close()
+        if exact:
+            rows = [exact] + [row for row in rows if row[0] != exact[0]][:limit - 1]
         return rows
 
+    @staticmethod
+    def find_by_name(name):
+        """Return the products named exactly `name` (same columns as get_product), oldest first."""
+        terms = Product._search_terms(name)
+        if not terms:
+            return []
+        cur = get_connection().execute("""
+            SELECT p.id, p.name, c.name, p.completion_date, d.name, p.status
+            FROM products_fts f
+            JOIN products p ON p.id = f.rowid
+            JOIN clients c ON c.id = p.client_id
+            LEFT JOIN departments d ON p.department_id = d.id
+            WHERE products_fts MATCH ? AND p.name = ?
+            ORDER BY f.rowid
+        """, ('name : "' + " ".join(terms) + '"', name))
+        return cur.fetchall()
+
+    # ------------------------------------------------------
+    @staticmethod
+    def iter_products(client=None, status=None, department_id=None, after_id=0, page_size=500):
+        """Yield matching products in id order, fetching one page at a time."""
+        while True:
+            page = Product.get_products_page(after_id, page_size, client, status, department_id)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    # ------------------------------------------------------
+    @staticmethod
+    def get_all_products():
+        """Return all products with department and status.
+
+        Loads the whole table; prefer iter_products() or get_products_page().
+        """
+        return list(Product.iter_products())
+
+    # ------------------------------------------------------
+    @staticmethod
+    def move_product(product_id, new_department_id, expected_department_id=None):
+        """Move product to next department and log movement.
+
+        With expected_department_id the move is a compare-and-swap: it only
+        happens if the product is still in that department and not yet
+        completed. The check is part of the UPDATE, so two stations that
+        scan the same unit cannot both advance it, and no lock is held
+        while the caller decides where the product goes next.
+
+        Returns True if the product moved, False if it does not exist or
+        was moved or completed by someone else first.
+        """
+        with transaction() as cur:
+            # Update department
+            if expected_department_id is None:
+                cur.execute("""
+                    UPDATE products
+                    SET department_id = ?
+                    WHERE id = ?
+                """, (new_department_id, product_id))
+            else:
+                cur.execute("""
+                    UPDATE products
+                    SET department_id = ?
+                    WHERE id = ? AND department_id = ? AND status != 'Completed'
+                """, (new_department_id, product_id, expected_department_id))
+            if cur.rowcount == 0:
+                return False
+
+            # Log movement
+            cur.execute("""
+                INSERT INTO product_movements (product_id, department_id, timestamp)
+                VALUES (?, ?, ?)
+            """, (product_id, new_department_id, now_us()))
+        return True
+
     # ------------------------------------------------------
     @staticmethod
-    def move_product(product_id, new_department_id):
-        """Move product to next department and log movement."""
-        conn = get_connection()
-        cur = conn.cursor()
+    def move_products_bulk(product_ids=None, department_id=None):
+        """Advance many products one department in a single transaction.
+
+        Select products either by a list of ids or by the department they are
+        currently in. Each product's next department is worked out in one
+        set-based statement (LEAD over the department order). Products in the
+        last department are marked Completed with a NULL-department movement,
+        exactly as mark_completed does. Completed products are left alone.
+
+        Returns (number moved, number completed).
+        """
+        if product_ids is not None:
+            selector, param = "p.id IN (SELECT value FROM json_each(?))", json.dumps(list(product_ids))
+        elif department_id is not None:
+            selector, param = "p.department_id = ?", department_id
+        else:
+            raise ValueError("Pass product_ids or department_id.")
+
+        with transaction() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS batch_moves (
+                    product_id INTEGER PRIMARY KEY,
+                    next_department_id INTEGER
+                )
+            """)
+            cur.execute(f"""
+                INSERT INTO temp.batch_moves (product_id, next_department_id)
+                SELECT p.id, seq.next_id
+                FROM products p
+                JOIN (
+                    SELECT id, LEAD(id) OVER (ORDER BY order_no) AS next_id
+                    FROM departments
+                ) seq ON seq.id = p.department_id
+                WHERE {selector} AND p.status != 'Completed'
+            """, (param,))
+
+            # Log every move; NULL department means finished
+            cur.execute("""
+                INSERT INTO product_movements (product_id, department_id, timestamp)
+                SELECT product_id, next_department_id, ?
+                FROM temp.batch_moves
+                ORDER BY product_id
+            """, (now_us(),))
 
-        # Update department
-        cur.execute("""
-            UPDATE products
-            SET department_id = ?
-            WHERE id = ?
-        """, (new_department_id, product_id))
+            cur.execute("""
+                UPDATE products
+                SET department_id = (
+                    SELECT next_department_id FROM temp.batch_moves WHERE product_id = products.id
+                )
+                WHERE id IN (SELECT product_id FROM temp.batch_moves WHERE next_department_id IS NOT NULL)
+            """)
+            moved = cur.rowcount
 
-        # Log movement
-        cur.execute("""
-            INSERT INTO product_movements (product_id, department_id, timestamp)
-            VALUES (?, ?, ?)
-        """, (product_id, new_department_id, datetime.now().isoformat()))
+            cur.execute("""
+                UPDATE products
+                SET status = 'Completed'
+                WHERE id IN (SELECT product_id FROM temp.batch_moves WHERE next_department_id IS NULL)
+            """)
+            completed = cur.rowcount
 
-        conn.commit()
-        conn.close()
+            cur.execute("DELETE FROM temp.batch_moves")
+
+        return moved, completed
 
     # ------------------------------------------------------
     @staticmethod
     def delete_product(product_id):
-        """Delete a product permanently."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM products WHERE id = ?", (product_id,))
-        conn.commit()
-        conn.close()
+        """Delete a product permanently, with its movements, progress and WIP checkpoint rows.
+
+        Returns True if the product existed.
+        """
+        with transaction() as cur:
+            cur.execute("DELETE FROM product_movements WHERE product_id = ?", (product_id,))
+            cur.execute("DELETE FROM progress WHERE product_id = ?", (product_id,))
+            cur.execute("DELETE FROM wip_checkpoint_rows WHERE product_id = ?", (product_id,))
+            cur.execute("DELETE FROM products WHERE id = ?", (product_id,))
+            return cur.rowcount > 0
 
     # ------------------------------------------------------
     @staticmethod
-    def get_product_history(product_id):
-        """Fetch a product's movement history."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT d.name, pm.timestamp
-            FROM product_movements pm
-            LEFT JOIN departments d ON pm.department_id = d.id
-            WHERE pm.product_id = ?
-            ORDER BY pm.timestamp
-        """, (product_id,))
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+    def get_product_history(product_id, include_archived=False):
+        """Fetch a product's movement history as (department, ISO local time).
+
+        The completion row has department None; a movement into a department
+        that has since been deleted shows as 'department #<id>'.
+
+        With include_archived=True the archive database is attached read-only
+        and its movements are merged in, for products that have been
+        archived. Without an archive file only live movements are returned.
+        """
+        if not include_archived:
+            cur = get_connection().execute("""
+                SELECT COALESCE(d.name, 'department #' || pm.department_id), pm.timestamp
+                FROM product_movements pm
+                LEFT JOIN departments d ON pm.department_id = d.id
+                WHERE pm.product_id = ?
+                ORDER BY pm.timestamp
+            """, (product_id,))
+            return [(name, format_us(ts)) for name, ts in cur]
+
+        with archive_attached(read_only=True) as conn:
+            if conn is None:
+                return Product.get_product_history(product_id)
+            cur = conn.execute("""
+                SELECT COALESCE(d.name, 'department #' || pm.department_id), pm.timestamp
+                FROM (
+                    SELECT department_id, timestamp FROM main.product_movements WHERE product_id = ?
+                    UNION ALL
+                    SELECT department_id, timestamp FROM archive.product_movements WHERE product_id = ?
+                ) pm
+                LEFT JOIN main.departments d ON pm.department_id = d.id
+                ORDER BY pm.timestamp
+            """, (product_id, product_id))
+            return [(name, format_us(ts)) for name, ts in cur]
 
     # ------------------------------------------------------
     @staticmethod
-    def mark_completed(product_id):
-        """Mark a product as completed when it reaches Dispatch."""
-        conn = get_connection()
-        cur = conn.cursor()
+    def mark_completed(product_id, expected_department_id=None):
+        """Mark a product as completed when it reaches Dispatch.
 
-        # Update product status
-        cur.execute("""
-            UPDATE products
-            SET status = 'Completed'
-            WHERE id = ?
-        """, (product_id,))
+        expected_department_id makes it a compare-and-swap, as in
+        move_product. Returns True if the product was completed.
+        """
+        with transaction() as cur:
+            # Update product status
+            if expected_department_id is None:
+                cur.execute("""
+                    UPDATE products
+                    SET status = 'Completed'
+                    WHERE id = ?
+                """, (product_id,))
+            else:
+                cur.execute("""
+                    UPDATE products
+                    SET status = 'Completed'
+                    WHERE id = ? AND department_id = ? AND status != 'Completed'
+                """, (product_id, expected_department_id))
+            if cur.rowcount == 0:
+                return False
 
-        # Log completion (NULL department means finished)
-        cur.execute("""
-            INSERT INTO product_movements (product_id, department_id, timestamp)
-            VALUES (?, NULL, ?)
-        """, (product_id, datetime.now().isoformat()))
+            # Log completion (NULL department means finished)
+            cur.execute("""
+                INSERT INTO product_movements (product_id, department_id, timestamp)
+                VALUES (?, NULL, ?)
+            """, (product_id, now_us()))
 
-        conn.commit()
-        conn.close()
         print("✅ Product marked as Completed.")
+        return True
@@ -0,0 +1,124 @@
+import sqlite3
+from datetime import timedelta
+from database import get_connection, transaction, archive_attached, to_us, now_us
+
+# Department of every in-progress product at :at, replayed from the nearest
+# checkpoint at or before :at (:since is its time, 0 and NULL when there is
+# none). For each product only the latest movement in (since, at] counts;
+# products that did not move in that window keep their checkpointed department.
+STATE_SQL = """
+    WITH recent AS MATERIALIZED (
+        SELECT product_id, department_id, MAX(timestamp)
+        FROM {movements}
+        WHERE timestamp > :since AND timestamp <= :at
+        GROUP BY product_id
+    )
+    SELECT product_id, department_id FROM recent WHERE department_id IS NOT NULL
+    UNION ALL
+    SELECT product_id, department_id FROM wip_checkpoint_rows
+    WHERE checkpoint_id = :checkpoint
+      AND product_id NOT IN (SELECT product_id FROM recent)
+"""
+
+WIP_SQL = """
+    SELECT d.name, COUNT(*)
+    FROM ({state}) s
+    JOIN main.departments d ON d.id = s.department_id
+    GROUP BY d.id
+    ORDER BY d.order_no
+"""
+
+BOTH_TIERS = """(
+    SELECT product_id, department_id, timestamp FROM main.product_movements
+    UNION ALL
+    SELECT product_id, department_id, timestamp FROM archive.product_movements
+)"""
+
+
+class Snapshot:
+    """Point-in-time work-in-progress, rebuilt from the movement log."""
+
+    @staticmethod
+    def normalize_time(value):
+        """Turn '2025-10-14 14:00' style input into stored epoch microseconds."""
+        return to_us(value)
+
+    @staticmethod
+    def _nearest_checkpoint(cur, at):
+        cur.execute("""
+            SELECT id, taken_at FROM wip_checkpoints
+            WHERE taken_at <= ?
+            ORDER BY taken_at DESC
+            LIMIT 1
+        """, (at,))
+        return cur.fetchone() or (None, 0)
+
+    @staticmethod
+    def wip_at(at, include_archived=False):
+        """Return (department, products in progress) as they stood at `at`.
+
+        Replays only the movements since the nearest checkpoint, using the
+        timestamp index. Archived products are left out unless
+        include_archived=True, which replays both tiers from the start
+        (the archive is attached read-only; without one, live data only).
+        """
+        at = Snapshot.normalize_time(at)
+        if include_archived:
+            with archive_attached(read_only=True) as conn:
+                if conn is not None:
+                    sql = WIP_SQL.format(state=STATE_SQL.format(movements=BOTH_TIERS))
+                    cur = conn.execute(sql, {"since": 0, "at": at, "checkpoint": None})
+                    return cur.fetchall()
+
+        cur = get_connection().cursor()
+        checkpoint, since = Snapshot._nearest_checkpoint(cur, at)
+        sql = WIP_SQL.format(state=STATE_SQL.format(movements="main.product_movements"))
+        cur.execute(sql, {"since": since, "at": at, "checkpoint": checkpoint})
+        return cur.fetchall()
+
+    @staticmethod
+    def create_checkpoint(at):
+        """Store every product's department at `at`. Returns the checkpoint id."""
+        at = Snapshot.normalize_time(at)
+        with transaction() as cur:
+            cur.execute("SELECT id FROM wip_checkpoints WHERE taken_at = ?", (at,))
+            existing = cur.fetchone()
+            if existing:
+                return existing[0]
+
+            checkpoint, since = Snapshot._nearest_checkpoint(cur, at)
+            cur.execute("INSERT INTO wip_checkpoints (taken_at) VALUES (?)", (at,))
+            new_id = cur.lastrowid
+            cur.execute(
+                "INSERT INTO wip_checkpoint_rows (checkpoint_id, product_id, department_id) "
+                "SELECT :new_id, product_id, department_id FROM ("
+                + STATE_SQL.format(movements="main.product_movements") + ")",
+                {"new_id": new_id, "since": since, "at": at, "checkpoint": checkpoint},
+            )
+        return new_id
+
+    @staticmethod
+    def checkpoint(interval_hours=168):
+        """Add any periodic checkpoints that are due, up to now.
+
+        Checkpoints are spaced `interval_hours` apart (weekly by default),
+        starting from the first movement, and each one is built from the
+        previous, so catching up is incremental. Returns how many were added.
+        """
+        cur = get_connection().cursor()
+        cur.execute("SELECT MAX(taken_at) FROM wip_checkpoints")
+        last = cur.fetchone()[0]
+        if last is None:
+            cur.execute("SELECT MIN(timestamp) FROM product_movements")
+            last = cur.fetchone()[0]
+            if last is None:
+                return 0
+
+        step = timedelta(hours=interval_hours) // timedelta(microseconds=1)
+        next_at = last + step
+        added = 0
+        while next_at <= now_us():
+            Snapshot.create_checkpoint(next_at)
+            next_at += step
+            added += 1
+        return added
@@ -1,5 +1,5 @@
 import sqlite3
-from database import get_connection
+from database import get_connection, transaction, cached, bump_generation
 
 
 class TeamLeader:
@@ -8,82 +8,77 @@ class TeamLeader:
     @staticmethod
     def get_all_team_leaders():
         """Fetch all team leaders with their assigned departments."""
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Ensure table exists before querying
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS team_leaders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            department_id INTEGER,
-            FOREIGN KEY (department_id) REFERENCES departments(id)
-        )
-        """)
-
-        cur.execute("""
+        cur = get_connection().execute("""
             SELECT tl.id, tl.name, d.name AS department
             FROM team_leaders tl
             LEFT JOIN departments d ON tl.department_id = d.id
             ORDER BY tl.id ASC
         """)
-        data = cur.fetchall()
-        conn.close()
-        return data
+        return cur.fetchall()
+
+    @staticmethod
+    def get_leaders_by_department():
+        """Return a cached {department_id: (leader_id, name)} map."""
+        def load():
+            cur = get_connection().execute("""
+                SELECT department_id, id, name
+                FROM team_leaders
+                WHERE department_id IS NOT NULL
+            """)
+            return {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+        return cached("leaders_by_department", load)
+
+    @staticmethod
+    def get_leader_for_department(department_id):
+        """Return (leader_id, name) for a department, or None."""
+        return TeamLeader.get_leaders_by_department().get(department_id)
 
     @staticmethod
     def add_team_leader(name, department_id):
         """Add a new team leader to a department."""
-        conn = get_connection()
-        cur = conn.cursor()
+        with transaction() as cur:
+            # Validate department existence
+            cur.execute("SELECT id FROM departments WHERE id = ?", (department_id,))
+            if not cur.fetchone():
+                print("⚠️ Department not found.")
+                return False
 
-        # Validate department existence
-        cur.execute("SELECT id FROM departments WHERE id = ?", (department_id,))
-        if not cur.fetchone():
-            print("⚠️ Department not found.")
-            conn.close()
-            return False
+            # Check for existing team leader with same name
+            cur.execute("SELECT * FROM team_leaders WHERE name = ?", (name,))
+            if cur.fetchone():
+                print("⚠️ Team leader already exists.")
+                return False
 
-        # Check for existing team leader with same name
-        cur.execute("SELECT * FROM team_leaders WHERE name = ?", (name,))
-        if cur.fetchone():
-            print("⚠️ Team leader already exists.")
-            conn.close()
-            return False
+            # Check if department already has a leader
+            cur.execute("SELECT * FROM team_leaders WHERE department_id = ?", (department_id,))
+            existing = cur.fetchone()
+            if existing:
+                print("⚠️ This department already has a team leader.")
+                return False
 
-        # Check if department already has a leader
-        cur.execute("SELECT * FROM team_leaders WHERE department_id = ?", (department_id,))
-        existing = cur.fetchone()
-        if existing:
-            print("⚠️ This department already has a team leader.")
-            conn.close()
-            return False
+            # Insert new team leader
+            cur.execute(
+                "INSERT INTO team_leaders (name, department_id) VALUES (?, ?)",
+                (name, department_id)
+            )
 
-        # Insert new team leader
-        cur.execute(
-            "INSERT INTO team_leaders (name, department_id) VALUES (?, ?)",
-            (name, department_id)
-        )
-        conn.commit()
-        conn.close()
+        bump_generation()
         print("✅ Team leader added successfully.")
         return True
 
     @staticmethod
     def delete_team_leader(name):
         """Delete a team leader by name."""
-        conn = get_connection()
-        cur = conn.cursor()
+        with transaction() as cur:
+            cur.execute("SELECT * FROM team_leaders WHERE name = ?", (name,))
+            leader = cur.fetchone()
+            if not leader:
+                print("⚠️ Team leader not found.")
+                return False
 
-        cur.execute("SELECT * FROM team_leaders WHERE name = ?", (name,))
-        leader = cur.fetchone()
-        if not leader:
-            print("⚠️ Team leader not found.")
-            conn.close()
-            return False
+            cur.execute("DELETE FROM team_leaders WHERE name = ?", (name,))
 
-        cur.execute("DELETE FROM team_leaders WHERE name = ?", (name,))
-        conn.commit()
-        conn.close()
+        bump_generation()
         print("🗑️ Team leader deleted successfully.")
         return True
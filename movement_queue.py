@@ -0,0 +1,235 @@
+"""Group-commit ingestion of movement scans.
+
+Product.move_product commits every scan on its own, so a burst of scans is
+capped by the per-commit cost. MovementQueue instead takes scans into
+memory and commits them in one transaction every `max_events` scans or
+`max_delay_ms` milliseconds, whichever comes first. With the default delay
+of 0 a batch is whatever queued up while the previous commit ran, so a
+lone scan is not held back. A delay only pays off for producers that do
+not wait for their acks; stations that wait for each ack are slowed down
+by it (see benchmark.py):
+
+    scans = MovementQueue()
+    ack = scans.submit(12, 3)      # returns at once
+    ack.result()                   # blocks until the move is committed
+    scans.close()
+
+A scan counts as recorded only once its future resolves. The timestamp is
+taken at submit time, so batching does not shift the history. A department
+of None completes the product, as mark_completed does. Pass
+expected_department_id for the same compare-and-swap as
+Product.move_product. A scan whose product does not exist, or is no longer
+where the station expected, fails its future with MoveRejected and logs
+no movement; the rest of its batch still commits. So does a scan that
+raises any other error, such as a bad argument: only its future fails.
+
+Durability: close() (also run at interpreter exit) commits everything
+still queued. If that final commit fails, for example because another
+process holds the lock, the scans are appended to a spool file (fsynced),
+their futures fail with EventSpooled, and the next MovementQueue replays
+the spool before accepting new scans. A hard crash loses only scans that
+had not been acknowledged.
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+import database
+
+_STOP = object()
+
+
+class EventSpooled(Exception):
+    """The scan was not committed at shutdown; it was saved to the spool file."""
+
+
+class MoveRejected(Exception):
+    """The product does not exist, or was not in the expected department any more."""
+
+
+def spool_path():
+    """Return the spool file that sits next to DB_NAME."""
+    root, _ = os.path.splitext(database.DB_NAME)
+    return os.environ.get("MANUFACTURING_SPOOL", f"{root}.spool.jsonl")
+
+
+class MovementQueue:
+    """Buffer movement scans and commit them in groups on a flusher thread."""
+
+    def __init__(self, max_events=500, max_delay_ms=0, spool=None):
+        self.max_events = max_events
+        self.max_delay = max_delay_ms / 1000
+        self.spool = spool or spool_path()
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._closing = False
+
+        self.replayed = self._replay_spool()
+        self._thread = threading.Thread(target=self._run, name="movement-queue", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, product_id, department_id, expected_department_id=None):
+        """Queue a move and return a Future that resolves once it is committed."""
+        future = Future()
+        # A queued scan cannot be withdrawn; cancel() on it returns False
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("MovementQueue is closed")
+            self._events.put((product_id, department_id, database.now_us(), expected_department_id, future))
+        return future
+
+    def move(self, product_id, department_id, expected_department_id=None):
+        """Queue a move and wait for its commit."""
+        return self.submit(product_id, department_id, expected_department_id).result()
+
+    def close(self, timeout=10):
+        """Commit everything queued, spooling whatever cannot be committed."""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            self._events.put(_STOP)
+        atexit.unregister(self.close)
+        self._thread.join(timeout)
+
+        # The flusher is stuck (e.g. waiting on a lock); save what it has not taken.
+        leftover = []
+        while True:
+            try:
+                item = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._spool(leftover)
+
+    # ------------------------------------------------------
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._events.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_events:
+                try:
+                    item = self._events.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+        database.close_connection()
+
+    def _commit(self, batch):
+        """Commit a batch in one transaction, or event by event if that fails.
+
+        A batch that finds the database busy is retried once as a whole, so
+        the lock costs one more busy_timeout wait rather than one per event.
+        If the batch still fails, each event is written on its own and an
+        event that raises gets the exception on its future; the rest still
+        commit.
+        """
+        try:
+            try:
+                applied = self._write(batch)
+            except sqlite3.OperationalError:
+                applied = self._write(batch)
+        except Exception as e:
+            # At shutdown only lock contention is worth spooling for a retry
+            if self._closing and isinstance(e, sqlite3.OperationalError):
+                self._spool(batch)
+                return
+            for event in batch:
+                try:
+                    ok = self._write([event])[0]
+                except Exception as e:
+                    event[4].set_exception(e)
+                else:
+                    self._resolve(event, ok)
+            return
+        for event, ok in zip(batch, applied):
+            self._resolve(event, ok)
+
+    @staticmethod
+    def _resolve(event, applied):
+        if applied:
+            event[4].set_result(event[2])
+        else:
+            reason = "does not exist" if event[3] is None else f"is not in department {event[3]} (or does not exist)"
+            event[4].set_exception(MoveRejected(f"Product {event[0]} {reason}."))
+
+    @staticmethod
+    def _write(events):
+        """Apply events in one transaction; returns whether each one matched its product."""
+        with database.transaction() as cur:
+            return [MovementQueue._apply(cur, *event[:4]) for event in events]
+
+    @staticmethod
+    def _apply(cur, product_id, dept_id, ts, expected_id):
+        """Move or complete one product, logging the movement only if its row was updated."""
+        # Per-event statements rather than executemany, for each event's rowcount
+        guard = "" if expected_id is None else " AND department_id = ? AND status != 'Completed'"
+        params = () if expected_id is None else (expected_id,)
+        if dept_id is None:
+            cur.execute("UPDATE products SET status = 'Completed' WHERE id = ?" + guard, (product_id, *params))
+        else:
+            cur.execute("UPDATE products SET department_id = ? WHERE id = ?" + guard,
+                        (dept_id, product_id, *params))
+        if cur.rowcount == 0:
+            return False
+        cur.execute("""
+            INSERT INTO product_movements (product_id, department_id, timestamp)
+            VALUES (?, ?, ?)
+        """, (product_id, dept_id, ts))
+        return True
+
+    # ------------------------------------------------------
+    def _spool(self, events):
+        with open(self.spool, "a", encoding="utf-8") as f:
+            for product_id, dept_id, ts, expected_id, _ in events:
+                f.write(json.dumps({"product_id": product_id, "department_id": dept_id, "timestamp": ts,
+                                    "expected_department_id": expected_id}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        for event in events:
+            event[4].set_exception(EventSpooled(self.spool))
+
+    def _replay_spool(self):
+        """Commit scans spooled by an earlier shutdown; returns how many were read.
+
+        Scans that no longer match their product are dropped, as they
+        would have been rejected at the time.
+        """
+        if not os.path.exists(self.spool):
+            return 0
+        with open(self.spool, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        for e in events:
+            # Spools written before the epoch-µs schema hold ISO text
+            e["timestamp"] = database.to_us(e["timestamp"])
+
+        with database.transaction() as cur:
+            for e in events:
+                # Skip scans already recorded, so a replay interrupted
+                # before the spool was removed is harmless to repeat.
+                cur.execute("""
+                    SELECT 1 FROM product_movements
+                    WHERE product_id = ? AND timestamp = ? AND department_id IS ?
+                """, (e["product_id"], e["timestamp"], e["department_id"]))
+                if cur.fetchone():
+                    continue
+                MovementQueue._apply(cur, e["product_id"], e["department_id"], e["timestamp"],
+                                     e.get("expected_department_id"))
+        os.remove(self.spool)
+        return len(events)
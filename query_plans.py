@@ -0,0 +1,168 @@
+"""Check that every model query is served by an index.
+
+Builds a scratch database with the real schema, runs each model operation
+with a trace callback to capture the statements it actually executes, and
+prints EXPLAIN QUERY PLAN for each one. Exits with status 1 if any query
+falls back to a full table scan.
+
+    python query_plans.py
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+import database
+
+# "--" marks statements SQLite runs internally, e.g. FTS5 reading its shadow tables
+SKIPPED_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE", "DROP", "ALTER", "ATTACH", "DETACH",
+                    "--")
+# FTS5 also (re)loads its settings with plain SELECTs on 'schema'.'<table>_config'
+FTS_SHADOW_TABLE = re.compile(r"'\w+'\.'\w+_(config|data|idx|docsize|content)'")
+
+
+def _checks():
+    """Model operations to check, with the table aliases each may scan.
+
+    A call that lists a whole table (e.g. every team leader) is allowed to
+    walk that table in rowid order; everything it joins must still be an
+    index lookup.
+    """
+    from models.analytics import Analytics
+    from models.change_feed import ChangeFeed
+    from models.archive import Archive
+    from models.client import Client
+    from models.department import Department
+    from models.maintenance import Maintenance
+    from models.movement import Movement
+    from models.product import Product
+    from models.snapshot import Snapshot
+    from models.team_leader import TeamLeader
+
+    return [
+        ("Department.get_all_departments", Department.get_all_departments, ()),
+        ("Department.add_department", lambda: Department.add_department("Quality", "Dispatch"), ()),
+        ("Department.delete_department", lambda: Department.delete_department("Quality"), ()),
+        ("TeamLeader.get_all_team_leaders", TeamLeader.get_all_team_leaders, ("tl",)),
+        ("TeamLeader.add_team_leader", lambda: TeamLeader.add_team_leader("Amina", 2), ()),
+        ("TeamLeader.delete_team_leader", lambda: TeamLeader.delete_team_leader("Amina"), ()),
+        ("Product.add_product", lambda: Product.add_product("Panel", "Acme", "2030-01-01", 1), ()),
+        ("Product.get_all_products", Product.get_all_products, ()),
+        ("Product.get_product", lambda: Product.get_product(1), ()),
+        ("Product.search", lambda: Product.search("pan ac"), ()),
+        ("Product.find_by_name", lambda: Product.find_by_name("Panel"), ()),
+        ("Movement.get_history", lambda: Movement.get_history("Panel"), ()),
+        ("Product.get_products_page(client)", lambda: Product.get_products_page(0, 20, client="Acme"), ()),
+        ("Product.get_products_page(client, status)",
+         lambda: Product.get_products_page(0, 20, client="Acme", status="In Progress"), ()),
+        ("Product.get_products_page(department)", lambda: Product.get_products_page(0, 20, department_id=2), ()),
+        ("Product.move_product", lambda: Product.move_product(1, 2), ()),
+        ("Product.move_product(expected)", lambda: Product.move_product(1, 3, expected_department_id=2), ()),
+        ("Product.move_products_bulk(ids)", lambda: Product.move_products_bulk(product_ids=[1]), ()),
+        ("Product.move_products_bulk(dept)", lambda: Product.move_products_bulk(department_id=3), ()),
+        ("Product.get_product_history", lambda: Product.get_product_history(1), ()),
+        ("Product.mark_completed(expected)", lambda: Product.mark_completed(1, expected_department_id=3), ()),
+        ("Product.mark_completed", lambda: Product.mark_completed(1), ()),
+        ("Analytics.refresh", Analytics.refresh, ()),
+        ("Analytics.get_dwell_times", Analytics.get_dwell_times, ()),
+        ("Analytics.get_bottleneck", Analytics.get_bottleneck, ()),
+        ("Analytics.get_daily_throughput", Analytics.get_daily_throughput, ()),
+        ("Analytics.forecast_deadlines", Analytics.forecast_deadlines, ("r",)),
+        ("Snapshot.create_checkpoint", lambda: Snapshot.create_checkpoint("2000-01-01"), ()),
+        ("Snapshot.wip_at", lambda: Snapshot.wip_at("2999-01-01"), ()),
+        ("Product.get_product_history(archived)",
+         lambda: Product.get_product_history(1, include_archived=True), ()),
+        ("Archive.archive_completed", lambda: Archive.archive_completed("2999-01-01"), ()),
+        ("Client.get_summary(archived)", lambda: Client.get_summary(include_archived=True),
+         ("main.client_summary",)),
+        ("Product.delete_product", lambda: Product.delete_product(1), ()),
+        ("Client.get_summary", Client.get_summary, ()),
+        ("Client.verify_summary", Client.verify_summary, ()),
+        ("Maintenance.purge_orphans", Maintenance.purge_orphans, ()),
+        ("Maintenance.get_products_in_missing_departments", Maintenance.get_products_in_missing_departments, ()),
+        ("ChangeFeed.get_cursor", ChangeFeed.get_cursor, ("sqlite_sequence",)),
+        ("ChangeFeed.get_changes", lambda: ChangeFeed.get_changes(after=2), ()),
+        ("ChangeFeed.prune", lambda: ChangeFeed.prune("2999-01-01", batch_size=2), ("change_log",)),
+        ("ChangeFeed.get_changes(pruned)", lambda: ChangeFeed.get_changes(after=ChangeFeed.get_cursor()),
+         ("sqlite_sequence",)),
+    ]
+
+
+def _full_scans(conn, sql, allowed):
+    """Return the plan lines of `sql` that scan a stored table without an index.
+
+    Scans of subqueries, CTEs, temp work tables and table-valued functions
+    walk the query's own working set, not the database, so they are not
+    flagged.
+    """
+    scans = []
+    work_sets = set()
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        detail = row[3]
+        if detail.startswith(("MATERIALIZE ", "CO-ROUTINE ")):
+            work_sets.add(detail.split()[1])
+        if not detail.startswith("SCAN ") or " USING " in detail or "VIRTUAL TABLE" in detail:
+            continue
+        table = detail.split()[1]
+        if table in allowed or table in work_sets or table.startswith(("(", "temp.")):
+            continue
+        scans.append(detail)
+    return scans
+
+
+def check_query_plans(verbose=True):
+    """Run every check against a scratch database and return the failures."""
+    original_db = database.DB_NAME
+    tmpdir = tempfile.mkdtemp(prefix="query_plans_")
+    database.DB_NAME = os.path.join(tmpdir, "plans.db")
+    try:
+        with redirect_stdout(io.StringIO()):
+            database.init_db()
+        conn = database.get_connection()
+        # Keep the archive tier attached so its queries can be explained too
+        with database.archive_attached():
+            failures = _run_checks(conn, verbose)
+    finally:
+        database.close_connection()
+        database.DB_NAME = original_db
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+    return failures
+
+
+def _run_checks(conn, verbose):
+    """Trace each model call and explain every statement it executed."""
+    failures = []
+    for label, call, allowed in _checks():
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            with redirect_stdout(io.StringIO()):
+                call()
+        finally:
+            conn.set_trace_callback(None)
+
+        # Trigger programs are traced under their parent statement's text
+        for sql in dict.fromkeys(statements):
+            if sql.lstrip().upper().startswith(SKIPPED_PREFIXES) or FTS_SHADOW_TABLE.search(sql):
+                continue
+            scans = _full_scans(conn, sql, allowed)
+            if verbose:
+                status = "❌" if scans else "✅"
+                print(f"{status} {label}: {' '.join(sql.split())[:90]}")
+                for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+                    print(f"      {row[3]}")
+            if scans:
+                failures.append((label, sql, scans))
+    return failures
+
+
+if __name__ == "__main__":
+    failed = check_query_plans()
+    if failed:
+        print(f"\n❌ {len(failed)} quer{'y' if len(failed) == 1 else 'ies'} fell back to a full table scan.")
+        sys.exit(1)
+    print("\n✅ Every model query uses an index.")
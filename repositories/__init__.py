@@ -0,0 +1,37 @@
+"""Interchangeable storage backends for the model operations.
+
+Both backends expose the same methods, with the same arguments and
+return values, as the models they stand in for (Product.get_product,
+Department.add_department, Client.get_summary, ...):
+
+    sqlite      the sqlite3 models themselves (default)
+    sqlalchemy  SQLAlchemy Core on a pooled Engine (MANUFACTURING_DB_URL,
+                default sqlite:///<MANUFACTURING_DB>)
+
+Pick one with MANUFACTURING_BACKEND or pass the name to get_repository().
+"""
+import os
+
+BACKENDS = ("sqlite", "sqlalchemy")
+
+_repositories = {}
+
+
+def get_repository(backend=None):
+    """Return the (shared) repository for `backend`."""
+    backend = backend or os.environ.get("MANUFACTURING_BACKEND", "sqlite")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}' (expected one of {', '.join(BACKENDS)}).")
+
+    if backend == "sqlite":
+        from repositories.sqlite_models import SqliteRepository
+        key = backend
+        factory = SqliteRepository
+    else:
+        from repositories.sqlalchemy_core import CoreRepository, default_url
+        key = (backend, default_url())
+        factory = lambda: CoreRepository(key[1])
+
+    if key not in _repositories:
+        _repositories[key] = factory()
+    return _repositories[key]
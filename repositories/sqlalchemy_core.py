@@ -0,0 +1,508 @@
+"""SQLAlchemy Core implementation of the repository interface.
+
+Connections come from the Engine's pool instead of being opened per call,
+and the fixed statements are built once at import. SQLAlchemy's compiled
+cache then reuses their SQL instead of recompiling per call. Bulk inserts
+pass a list of parameter sets to insert(), which SQLAlchemy sends as
+multi-row INSERT ... VALUES batches ("insertmanyvalues").
+
+On SQLite the schema, and the triggers that keep client_summary current,
+come from database.ensure_schema(). On a server database the tables are
+created from the metadata below and client summaries are aggregated on
+read. The archive tier is an attached SQLite file next to
+database.DB_NAME, so include_archived reads are handed to the sqlite
+models when the engine is on that same file, and raise ValueError
+otherwise.
+"""
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from sqlalchemy import (BigInteger, Column, ForeignKey, Integer, MetaData, Table, Text, and_,
+                        bindparam, case, create_engine, delete, event, func, insert, literal, or_,
+                        select, text, update)
+
+import database
+from models.client import Client
+from models.department import DepartmentSequence
+from models.product import Product
+
+metadata = MetaData()
+
+departments = Table(
+    "departments", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", Text, nullable=False, unique=True),
+    Column("order_no", Integer, nullable=False),
+)
+
+team_leaders = Table(
+    "team_leaders", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", Text, nullable=False, unique=True),
+    Column("department_id", Integer, ForeignKey("departments.id")),
+)
+
+clients = Table(
+    "clients", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", Text, nullable=False, unique=True),
+)
+
+products = Table(
+    "products", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", Text, nullable=False),
+    Column("client_id", Integer, ForeignKey("clients.id"), nullable=False),
+    Column("completion_date", Text, nullable=False),
+    Column("department_id", Integer, ForeignKey("departments.id")),
+    Column("status", Text, server_default="In Progress"),
+)
+
+product_movements = Table(
+    "product_movements", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("product_id", Integer, ForeignKey("products.id"), nullable=False),
+    Column("department_id", Integer, ForeignKey("departments.id")),
+    Column("timestamp", BigInteger, nullable=False),  # epoch microseconds, UTC
+)
+
+client_summary = Table(
+    "client_summary", metadata,
+    Column("client_id", Integer, ForeignKey("clients.id"), primary_key=True),
+    Column("total", Integer, nullable=False),
+    Column("completed", Integer, nullable=False),
+    Column("pipeline", Integer, nullable=False),
+)
+
+# --------------------- STATEMENTS -----------------------
+
+PRODUCT_ROWS = (
+    select(products.c.id, products.c.name, clients.c.name, products.c.completion_date,
+           departments.c.name, products.c.status)
+    .select_from(products.join(clients, products.c.client_id == clients.c.id)
+                 .outerjoin(departments, products.c.department_id == departments.c.id))
+)
+GET_PRODUCT = PRODUCT_ROWS.where(products.c.id == bindparam("product_id"))
+
+# SQLite only: products_fts is a virtual table maintained by database.py triggers
+SEARCH_FTS = text("""
+    SELECT p.id, p.name, c.name, p.completion_date, d.name, p.status
+    FROM products_fts f
+    JOIN products p ON p.id = f.rowid
+    JOIN clients c ON c.id = p.client_id
+    LEFT JOIN departments d ON p.department_id = d.id
+    WHERE products_fts MATCH :match
+    ORDER BY f.rowid DESC
+    LIMIT :limit
+""")
+
+INSERT_PRODUCT = insert(products)
+INSERT_MOVEMENT = insert(product_movements)
+MOVE_PRODUCT = (update(products).where(products.c.id == bindparam("b_id"))
+                .values(department_id=bindparam("b_department_id")))
+COMPLETE_PRODUCT = (update(products).where(products.c.id == bindparam("b_id"))
+                    .values(status="Completed"))
+# Compare-and-swap forms: only touch a product still in b_expected_id
+MOVE_PRODUCT_IF = MOVE_PRODUCT.where(products.c.department_id == bindparam("b_expected_id"),
+                                     products.c.status != "Completed")
+COMPLETE_PRODUCT_IF = COMPLETE_PRODUCT.where(products.c.department_id == bindparam("b_expected_id"),
+                                             products.c.status != "Completed")
+DELETE_PRODUCT = delete(products).where(products.c.id == bindparam("product_id"))
+DELETE_PRODUCT_MOVEMENTS = delete(product_movements).where(product_movements.c.product_id == bindparam("product_id"))
+# SQLite only: progress and WIP checkpoint rows live in tables from database.py
+DELETE_PRODUCT_EXTRAS = (
+    text("DELETE FROM progress WHERE product_id = :product_id"),
+    text("DELETE FROM wip_checkpoint_rows WHERE product_id = :product_id"),
+)
+
+HISTORY = (
+    select(func.coalesce(departments.c.name,
+                         literal("department #").concat(product_movements.c.department_id)),
+           product_movements.c.timestamp)
+    .select_from(product_movements.outerjoin(
+        departments, product_movements.c.department_id == departments.c.id))
+    .where(product_movements.c.product_id == bindparam("product_id"))
+    .order_by(product_movements.c.timestamp)
+)
+
+ALL_DEPARTMENTS = select(departments.c.id, departments.c.name, departments.c.order_no).order_by(
+    departments.c.order_no)
+
+ALL_TEAM_LEADERS = (
+    select(team_leaders.c.id, team_leaders.c.name, departments.c.name)
+    .select_from(team_leaders.outerjoin(departments, team_leaders.c.department_id == departments.c.id))
+    .order_by(team_leaders.c.id)
+)
+LEADER_FOR_DEPARTMENT = select(team_leaders.c.id, team_leaders.c.name).where(
+    team_leaders.c.department_id == bindparam("department_id"))
+
+CLIENT_ID = select(clients.c.id).where(clients.c.name == bindparam("name"))
+INSERT_CLIENT = insert(clients)
+
+STORED_SUMMARY = (
+    select(clients.c.name, client_summary.c.total, client_summary.c.completed, client_summary.c.pipeline)
+    .select_from(client_summary.join(clients, client_summary.c.client_id == clients.c.id))
+    .order_by(clients.c.name)
+)
+AGGREGATED_SUMMARY = (
+    select(clients.c.name,
+           func.count(),
+           func.sum(case((products.c.status == "Completed", 1), else_=0)),
+           func.sum(case((products.c.status != "Completed", 1), else_=0)))
+    .select_from(products.join(clients, products.c.client_id == clients.c.id))
+    .group_by(clients.c.id, clients.c.name)
+    .order_by(clients.c.name)
+)
+
+
+def default_url():
+    return os.environ.get("MANUFACTURING_DB_URL", f"sqlite:///{database.DB_NAME}")
+
+
+def _tuples(result):
+    return [tuple(row) for row in result]
+
+
+class CoreRepository:
+    """Model operations on a pooled SQLAlchemy Engine."""
+
+    def __init__(self, url, pool_size=5, query_cache_size=500):
+        self.engine = create_engine(url, pool_size=pool_size, query_cache_size=query_cache_size)
+        self.is_sqlite = self.engine.dialect.name == "sqlite"
+        self._client_ids = {}   # normalized name -> id, only for committed clients
+        if self.is_sqlite:
+            event.listen(self.engine, "connect", self._on_sqlite_connect)
+            event.listen(self.engine, "begin", self._on_sqlite_begin)
+        else:
+            metadata.create_all(self.engine)
+
+    @staticmethod
+    def _on_sqlite_connect(dbapi_connection, connection_record):
+        # Let the "begin" listener issue BEGIN instead of the sqlite3 driver
+        dbapi_connection.isolation_level = None
+        for pragma in database.CONNECTION_PRAGMAS:
+            dbapi_connection.execute(pragma)
+
+    @staticmethod
+    def _on_sqlite_begin(conn):
+        # Writers take the lock up front, as database.transaction() does
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.get_execution_options().get("write") else "BEGIN")
+
+    @contextmanager
+    def _writing(self):
+        """A connection in a write transaction that commits on exit."""
+        with self.engine.connect() as conn:
+            conn.execution_options(write=True)
+            with conn.begin():
+                yield conn
+
+    def _intern_clients(self, conn, names):
+        """Return ({name: client_id}, {normalized name: client_id}), adding missing clients.
+
+        Callers merge the second map into the cache once their transaction
+        has committed, so a rollback never leaves a dangling id behind.
+        """
+        ids, resolved = {}, {}
+        for name in names:
+            clean = database.normalize_client_name(name)
+            client_id = self._client_ids.get(clean) or resolved.get(clean)
+            if client_id is None:
+                client_id = conn.execute(CLIENT_ID, {"name": clean}).scalar()
+            if client_id is None:
+                client_id = conn.execute(INSERT_CLIENT, {"name": clean}).inserted_primary_key[0]
+            resolved[clean] = ids[name] = client_id
+        return ids, resolved
+
+    def _client_id(self, name):
+        clean = database.normalize_client_name(name)
+        if clean not in self._client_ids:
+            with self.engine.connect() as conn:
+                client_id = conn.execute(CLIENT_ID, {"name": clean}).scalar()
+            if client_id is None:
+                return None
+            self._client_ids[clean] = client_id
+        return self._client_ids[clean]
+
+    def _check_archive(self):
+        """Raise ValueError unless the sqlite models' archive tier belongs to this engine's file."""
+        path = self.engine.url.database if self.is_sqlite else None
+        if not path or os.path.abspath(path) != os.path.abspath(database.DB_NAME):
+            raise ValueError("Archived data is only available when the backend uses the SQLite "
+                             "file set with --db / MANUFACTURING_DB.")
+
+    def dispose(self):
+        """Close every pooled connection."""
+        self.engine.dispose()
+
+    # --------------------- PRODUCTS -----------------------
+
+    def add_product(self, name, client, completion_date, department_id):
+        if not name or not client:
+            print("⚠️ Product name and client are required.")
+            return False
+        try:
+            completion_date = Product.clean_completion_date(completion_date)
+        except ValueError as e:
+            print(f"⚠️ {e}")
+            return False
+        with self._writing() as conn:
+            client_ids, new_clients = self._intern_clients(conn, [client])
+            product_id = conn.execute(INSERT_PRODUCT, {
+                "name": name, "client_id": client_ids[client],
+                "completion_date": completion_date, "department_id": department_id,
+            }).inserted_primary_key[0]
+            conn.execute(INSERT_MOVEMENT, {"product_id": product_id, "department_id": department_id,
+                                           "timestamp": database.now_us()})
+        self._client_ids.update(new_clients)
+        return product_id
+
+    def add_products_bulk(self, rows, batch_size=500):
+        sequence = self.get_sequence()
+        names = {row[1]: row[0] for row in sequence.rows}
+        first_department = sequence.first[0] if sequence.first else None
+
+        added = 0
+        errors = []
+        numbered = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(numbered, batch_size))
+            if not chunk:
+                break
+
+            batch = []
+            for row_no, row in chunk:
+                try:
+                    name, client, completion_date, department_id = Product.clean_import_row(
+                        row, names, first_department)
+                except ValueError as e:
+                    errors.append((row_no, str(e)))
+                    continue
+                batch.append({"name": name, "client": client, "completion_date": completion_date,
+                              "department_id": department_id})
+
+            if batch:
+                timestamp = database.now_us()
+                with self._writing() as conn:
+                    client_ids, new_clients = self._intern_clients(conn, [row["client"] for row in batch])
+                    for row in batch:
+                        row["client_id"] = client_ids[row.pop("client")]
+                    ids = conn.execute(
+                        INSERT_PRODUCT.returning(products.c.id, sort_by_parameter_order=True), batch
+                    ).scalars().all()
+                    conn.execute(INSERT_MOVEMENT, [
+                        {"product_id": product_id, "department_id": row["department_id"],
+                         "timestamp": timestamp}
+                        for product_id, row in zip(ids, batch)
+                    ])
+                self._client_ids.update(new_clients)
+                added += len(batch)
+
+        return added, errors
+
+    def get_product(self, product_id):
+        with self.engine.connect() as conn:
+            row = conn.execute(GET_PRODUCT, {"product_id": product_id}).first()
+        return tuple(row) if row else None
+
+    def get_products_page(self, after_id=0, limit=50, client=None, status=None, department_id=None):
+        query = PRODUCT_ROWS.where(products.c.id > after_id)
+        if client is not None:
+            query = query.where(products.c.client_id == self._client_id(client))
+        if status is not None:
+            query = query.where(products.c.status == status)
+        if department_id is not None:
+            query = query.where(products.c.department_id == department_id)
+        with self.engine.connect() as conn:
+            return _tuples(conn.execute(query.order_by(products.c.id).limit(limit)))
+
+    def iter_products(self, client=None, status=None, department_id=None, after_id=0, page_size=500):
+        while True:
+            page = self.get_products_page(after_id, page_size, client, status, department_id)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    def get_all_products(self):
+        return list(self.iter_products())
+
+    def search(self, query, limit=10):
+        terms = Product._search_terms(query)
+        if not terms:
+            return []
+        with self.engine.connect() as conn:
+            if self.is_sqlite:
+                match = " ".join(f'"{term}"*' for term in terms)
+                rows = _tuples(conn.execute(SEARCH_FTS, {"match": match, "limit": limit}))
+            else:
+                # No FTS5 here: substring matches over a scan, for parity only
+                words = [or_(products.c.name.ilike(f"%{term}%"), clients.c.name.ilike(f"%{term}%"))
+                         for term in terms]
+                rows = _tuples(conn.execute(
+                    PRODUCT_ROWS.where(and_(*words)).order_by(products.c.id.desc()).limit(limit)))
+        exact = self.get_product(int(query)) if query.strip().isdecimal() else None
+        if exact:
+            rows = [exact] + [row for row in rows if row[0] != exact[0]][:limit - 1]
+        return rows
+
+    def move_product(self, product_id, new_department_id, expected_department_id=None):
+        params = {"b_id": product_id, "b_department_id": new_department_id}
+        with self._writing() as conn:
+            if expected_department_id is None:
+                result = conn.execute(MOVE_PRODUCT, params)
+            else:
+                result = conn.execute(MOVE_PRODUCT_IF, {**params, "b_expected_id": expected_department_id})
+            if result.rowcount == 0:
+                return False
+            conn.execute(INSERT_MOVEMENT, {"product_id": product_id, "department_id": new_department_id,
+                                           "timestamp": database.now_us()})
+        return True
+
+    def move_products_bulk(self, product_ids=None, department_id=None):
+        if product_ids is not None:
+            selector = products.c.id.in_(list(product_ids))
+        elif department_id is not None:
+            selector = products.c.department_id == department_id
+        else:
+            raise ValueError("Pass product_ids or department_id.")
+
+        next_by_id = self.get_sequence().next_by_id
+        timestamp = database.now_us()
+        with self._writing() as conn:
+            current = conn.execute(
+                select(products.c.id, products.c.department_id)
+                .where(selector, products.c.status != "Completed")
+                .order_by(products.c.id)
+            ).all()
+            moves = [(pid, next_by_id[dept][0] if next_by_id[dept] else None)
+                     for pid, dept in current if dept in next_by_id]
+            if not moves:
+                return 0, 0
+
+            conn.execute(INSERT_MOVEMENT, [
+                {"product_id": pid, "department_id": dept, "timestamp": timestamp} for pid, dept in moves
+            ])
+            moved = [{"b_id": pid, "b_department_id": dept} for pid, dept in moves if dept is not None]
+            completed = [{"b_id": pid} for pid, dept in moves if dept is None]
+            if moved:
+                conn.execute(MOVE_PRODUCT, moved)
+            if completed:
+                conn.execute(COMPLETE_PRODUCT, completed)
+        return len(moved), len(completed)
+
+    def delete_product(self, product_id):
+        params = {"product_id": product_id}
+        with self._writing() as conn:
+            conn.execute(DELETE_PRODUCT_MOVEMENTS, params)
+            if self.is_sqlite:
+                for statement in DELETE_PRODUCT_EXTRAS:
+                    conn.execute(statement, params)
+            return conn.execute(DELETE_PRODUCT, params).rowcount > 0
+
+    def get_product_history(self, product_id, include_archived=False):
+        if include_archived:
+            self._check_archive()
+            return Product.get_product_history(product_id, include_archived=True)
+        with self.engine.connect() as conn:
+            rows = conn.execute(HISTORY, {"product_id": product_id})
+            return [(name, database.format_us(ts)) for name, ts in rows]
+
+    def mark_completed(self, product_id, expected_department_id=None):
+        with self._writing() as conn:
+            if expected_department_id is None:
+                result = conn.execute(COMPLETE_PRODUCT, {"b_id": product_id})
+            else:
+                result = conn.execute(COMPLETE_PRODUCT_IF, {"b_id": product_id,
+                                                            "b_expected_id": expected_department_id})
+            if result.rowcount == 0:
+                return False
+            conn.execute(INSERT_MOVEMENT, {"product_id": product_id, "department_id": None,
+                                           "timestamp": database.now_us()})
+        print("✅ Product marked as Completed.")
+        return True
+
+    # --------------------- DEPARTMENTS -----------------------
+
+    def get_all_departments(self):
+        with self.engine.connect() as conn:
+            return _tuples(conn.execute(ALL_DEPARTMENTS))
+
+    def get_sequence(self):
+        return DepartmentSequence(self.get_all_departments())
+
+    def add_department(self, name, before_name):
+        with self._writing() as conn:
+            names = [row[1] for row in conn.execute(ALL_DEPARTMENTS)]
+            if before_name in names:
+                position = names.index(before_name) + 1
+                conn.execute(update(departments).where(departments.c.order_no >= position)
+                             .values(order_no=departments.c.order_no + 1))
+            else:
+                position = len(names) + 1
+            conn.execute(insert(departments), {"name": name, "order_no": position})
+        return True
+
+    def delete_department(self, name):
+        with self._writing() as conn:
+            row = conn.execute(select(departments.c.id, departments.c.order_no)
+                               .where(departments.c.name == name)).first()
+            if row is None:
+                return False
+            department_id, order_no = row
+            count = conn.execute(select(func.count()).select_from(products)
+                                 .where(products.c.department_id == department_id)).scalar()
+            if count:
+                print(f"⚠️ {count} product(s) are still in '{name}'. "
+                      "Move them on, or archive the completed ones, first.")
+                return False
+            conn.execute(update(team_leaders).where(team_leaders.c.department_id == department_id)
+                         .values(department_id=None))
+            conn.execute(delete(departments).where(departments.c.id == department_id))
+            conn.execute(update(departments).where(departments.c.order_no > order_no)
+                         .values(order_no=departments.c.order_no - 1))
+        return True
+
+    # --------------------- TEAM LEADERS -----------------------
+
+    def get_all_team_leaders(self):
+        with self.engine.connect() as conn:
+            return _tuples(conn.execute(ALL_TEAM_LEADERS))
+
+    def get_leader_for_department(self, department_id):
+        with self.engine.connect() as conn:
+            row = conn.execute(LEADER_FOR_DEPARTMENT, {"department_id": department_id}).first()
+        return tuple(row) if row else None
+
+    def add_team_leader(self, name, department_id):
+        with self._writing() as conn:
+            if conn.execute(select(departments.c.id).where(departments.c.id == department_id)).first() is None:
+                print("⚠️ Department not found.")
+                return False
+            if conn.execute(select(team_leaders.c.id).where(team_leaders.c.name == name)).first():
+                print("⚠️ Team leader already exists.")
+                return False
+            if conn.execute(LEADER_FOR_DEPARTMENT, {"department_id": department_id}).first():
+                print("⚠️ This department already has a team leader.")
+                return False
+            conn.execute(insert(team_leaders), {"name": name, "department_id": department_id})
+        print("✅ Team leader added successfully.")
+        return True
+
+    def delete_team_leader(self, name):
+        with self._writing() as conn:
+            deleted = conn.execute(delete(team_leaders).where(team_leaders.c.name == name)).rowcount
+        if not deleted:
+            print("⚠️ Team leader not found.")
+            return False
+        print("🗑️ Team leader deleted successfully.")
+        return True
+
+    # --------------------- CLIENTS -----------------------
+
+    def get_summary(self, include_archived=False):
+        if include_archived:
+            self._check_archive()
+            return Client.get_summary(include_archived=True)
+        with self.engine.connect() as conn:
+            return _tuples(conn.execute(STORED_SUMMARY if self.is_sqlite else AGGREGATED_SUMMARY))
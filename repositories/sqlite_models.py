@@ -0,0 +1,26 @@
+from models.client import Client
+from models.department import Department
+from models.product import Product
+from models.team_leader import TeamLeader
+
+# Repository method -> the model that implements it
+METHODS = {
+    **dict.fromkeys(("add_product", "add_products_bulk", "get_product", "get_products_page",
+                     "iter_products", "get_all_products", "move_product", "move_products_bulk",
+                     "delete_product", "get_product_history", "mark_completed", "search"), Product),
+    **dict.fromkeys(("get_all_departments", "get_sequence", "add_department", "delete_department"),
+                    Department),
+    **dict.fromkeys(("get_all_team_leaders", "get_leader_for_department", "add_team_leader",
+                     "delete_team_leader"), TeamLeader),
+    "get_summary": Client,
+}
+
+
+class SqliteRepository:
+    """The sqlite3 models behind the repository interface."""
+
+    def __getattr__(self, name):
+        # Looked up on every call, so instrumentation's wrappers are seen
+        if name not in METHODS:
+            raise AttributeError(name)
+        return getattr(METHODS[name], name)
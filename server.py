@@ -0,0 +1,276 @@
+"""Read-only HTTP/JSON API for shop-floor dashboards.
+
+    python server.py --port 8080
+
+    GET /products?client=&status=&department=&after_id=&limit=
+    GET /products/search?q=&limit=
+    GET /products/<id>
+    GET /products/<id>/history?archived=1
+    GET /departments
+    GET /departments/<name>/board
+    GET /summary?archived=1
+    GET /changes?after=&limit=
+
+Requests are handled by a fixed pool of worker threads, each with its own
+pooled connection. Every response carries an ETag. A rendered response is
+reused until data_generation() (PRAGMA data_version) reports a commit, so
+dozens of screens polling the same URL cost one query per change. A poll
+that sends the ETag back in If-None-Match gets 304 Not Modified.
+With archived=1 the archive database is attached read-only; until the
+first archive run creates it, those routes return live data only.
+/changes pages through the change feed (models/change_feed.py); follow
+next_after, and re-read everything on a 400 for a pruned cursor.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import click
+
+import database
+
+PRODUCT_COLUMNS = ("id", "name", "client", "completion_date", "department", "status")
+MAX_PAGE = 500
+CACHE_SIZE = 256
+
+
+class NotFound(Exception):
+    pass
+
+
+def _flag(query, name):
+    return query.get(name, [""])[0].lower() in ("1", "true", "yes")
+
+
+def _int(query, name, default):
+    value = query.get(name, [default])[0]
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer, not {value!r}.") from None
+
+
+def _limit(query, default):
+    # LIMIT -1 is no limit in SQLite, so clamp from below as well
+    return max(1, min(_int(query, "limit", default), MAX_PAGE))
+
+
+def _department_id(name):
+    from models.department import Department
+
+    department = Department.get_sequence().by_name.get(name)
+    if department is None:
+        raise NotFound(f"Department '{name}' not found.")
+    return department[0]
+
+
+# --------------------- ROUTES -----------------------
+
+def products(query):
+    from models.product import Product
+
+    department = query.get("department", [None])[0]
+    rows = Product.get_products_page(
+        after_id=_int(query, "after_id", 0),
+        limit=_limit(query, 50),
+        client=query.get("client", [None])[0],
+        status=query.get("status", [None])[0],
+        department_id=_department_id(department) if department else None,
+    )
+    return {"products": [dict(zip(PRODUCT_COLUMNS, row)) for row in rows],
+            "next_after_id": rows[-1][0] if rows else None}
+
+
+def search(query):
+    from models.product import Product
+
+    rows = Product.search(query.get("q", [""])[0], _limit(query, 10))
+    return {"products": [dict(zip(PRODUCT_COLUMNS, row)) for row in rows]}
+
+
+def product(query, product_id):
+    from models.product import Product
+
+    row = Product.get_product(int(product_id))
+    if row is None:
+        raise NotFound(f"Product {product_id} not found.")
+    return dict(zip(PRODUCT_COLUMNS, row))
+
+
+def history(query, product_id):
+    from models.product import Product
+
+    rows = Product.get_product_history(int(product_id), include_archived=_flag(query, "archived"))
+    return [{"department": name or "Completed", "timestamp": ts} for name, ts in rows]
+
+
+def departments(query):
+    from models.department import Department
+    from models.team_leader import TeamLeader
+
+    result = []
+    for dept_id, name, order_no in Department.get_all_departments():
+        leader = TeamLeader.get_leader_for_department(dept_id)
+        result.append({"id": dept_id, "name": name, "order_no": order_no,
+                       "leader": leader[1] if leader else None})
+    return result
+
+
+def board(query, name):
+    from models.product import Product
+
+    rows = Product.iter_products(status="In Progress", department_id=_department_id(name))
+    return {"department": name, "products": [dict(zip(PRODUCT_COLUMNS, row)) for row in rows]}
+
+
+def summary(query):
+    from models.client import Client
+
+    rows = Client.get_summary(include_archived=_flag(query, "archived"))
+    return [dict(zip(("client", "total", "completed", "pipeline"), row)) for row in rows]
+
+
+def changes(query):
+    from models.change_feed import ChangeFeed
+
+    after = _int(query, "after", 0)
+    rows = ChangeFeed.get_changes(after=after, limit=_limit(query, MAX_PAGE))
+    return {"changes": [dict(zip(("seq", "entity", "entity_id", "op", "changed_at"), row)) for row in rows],
+            "next_after": rows[-1][0] if rows else after}
+
+
+ROUTES = [
+    (re.compile(r"^/products$"), products),
+    (re.compile(r"^/products/search$"), search),
+    (re.compile(r"^/products/(\d+)$"), product),
+    (re.compile(r"^/products/(\d+)/history$"), history),
+    (re.compile(r"^/departments$"), departments),
+    (re.compile(r"^/departments/([^/]+)/board$"), board),
+    (re.compile(r"^/summary$"), summary),
+    (re.compile(r"^/changes$"), changes),
+]
+
+
+# --------------------- RESPONSE CACHE -----------------------
+
+_responses = OrderedDict()   # url -> (generation, etag, body), least recent first
+_responses_lock = threading.Lock()
+
+
+def render(url):
+    """Return (etag, body) for a GET of `url`, reusing it while the data is unchanged."""
+    generation = (database.DB_NAME, database.data_generation())
+    with _responses_lock:
+        entry = _responses.get(url)
+        if entry is not None and entry[0] == generation:
+            _responses.move_to_end(url)
+            return entry[1], entry[2]
+
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    for pattern, handler in ROUTES:
+        match = pattern.match(parts.path)
+        if match:
+            data = handler(query, *(unquote(s) for s in match.groups()))
+            break
+    else:
+        raise NotFound(f"No route for {parts.path}.")
+
+    body = json.dumps(data, default=str).encode()
+    # Content hash, so a spurious generation bump still revalidates as 304
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    with _responses_lock:
+        _responses[url] = (generation, etag, body)
+        _responses.move_to_end(url)
+        while len(_responses) > CACHE_SIZE:
+            _responses.popitem(last=False)
+    return etag, body
+
+
+# --------------------- SERVER -----------------------
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "ManufacturingTracker/1.0"
+
+    def do_GET(self):
+        try:
+            etag, body = render(self.path)
+        except NotFound as e:
+            return self._send(404, json.dumps({"error": str(e)}).encode())
+        except ValueError as e:
+            return self._send(400, json.dumps({"error": str(e)}).encode())
+
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            return self._send(304, b"", etag)
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each request to a fixed pool of worker threads.
+
+    Unlike ThreadingHTTPServer's thread per request, the workers live as
+    long as the server, so each keeps its pooled connection.
+    """
+
+    def __init__(self, address, workers=8):
+        super().__init__(address, Handler)
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8080, show_default=True)
+@click.option("--workers", default=8, show_default=True, help="Worker threads (and connections).")
+@click.option("--db", envvar="MANUFACTURING_DB", default=database.DB_NAME, show_default=True,
+              help="SQLite database file.")
+def main(host, port, workers, db):
+    """Serve the read API."""
+    database.DB_NAME = db
+    database.ensure_schema()
+    server = PooledHTTPServer((host, port), workers)
+    click.echo(f"🌐 Serving {db} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
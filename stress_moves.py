@@ -0,0 +1,156 @@
+"""Stress concurrent product moves from several processes at once.
+
+    python stress_moves.py --workers 8 --products 1000
+    python stress_moves.py --unchecked      # blind moves, to see what goes wrong
+
+A fresh database gets --products products in the first department. Each
+worker process then acts like a scanning station: it picks a random
+unfinished product, reads its department, works out the next one and moves
+it there with Product.move_product(..., expected_department_id=...), or
+completes it from the last department. A scan that loses the race to
+another station is a conflict; the product simply gets scanned again
+later. Workers stop once every product is Completed.
+
+Afterwards every product's movement log must read exactly: first
+department, ..., last department, completion. One entry per step, none
+lost and none doubled, and the moves the workers saw succeed must add up
+to the log. Exits 1 if not, or if fewer than --min-rate moves per second
+were committed.
+"""
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+
+import click
+
+import database
+
+
+def _station(db, product_ids, seed, unchecked):
+    """Scan random products until all are Completed; returns (moved, conflicts, start, end)."""
+    from models.department import Department
+    from models.product import Product
+
+    database.DB_NAME = db
+    rng = random.Random(seed)
+    sequence = Department.get_sequence()
+    pending = list(product_ids)
+    moved = conflicts = 0
+    start = time.time()
+    with redirect_stdout(io.StringIO()):
+        while pending:
+            i = rng.randrange(len(pending))
+            product = Product.get_product(pending[i])
+            if product[5] == "Completed":
+                pending[i] = pending[-1]
+                pending.pop()
+                continue
+
+            current = sequence.by_name[product[4]]
+            expected = None if unchecked else current[0]
+            next_dept = sequence.next_by_id[current[0]]
+            if next_dept:
+                ok = Product.move_product(product[0], next_dept[0], expected_department_id=expected)
+            else:
+                ok = Product.mark_completed(product[0], expected_department_id=expected)
+            if ok:
+                moved += 1
+            else:
+                conflicts += 1
+    end = time.time()
+    database.close_connection()
+    return moved, conflicts, start, end
+
+
+def _setup(db, products):
+    """Create the schema and `products` products in the first department; returns their ids."""
+    from models.product import Product
+
+    database.DB_NAME = db
+    with redirect_stdout(io.StringIO()):
+        database.ensure_schema()
+        Product.add_products_bulk({"name": f"Unit {i}", "client": f"Client {i % 20:02d}",
+                                   "completion_date": "2030-12-31"} for i in range(products))
+    ids = [row[0] for row in database.get_connection().execute("SELECT id FROM products ORDER BY id")]
+    database.close_connection()
+    return ids
+
+
+def verify(db, moved):
+    """Return a list of problems with the movement log after a run (empty if none)."""
+    database.DB_NAME = db
+    conn = database.get_connection()
+    route = [row[0] for row in conn.execute("SELECT id FROM departments ORDER BY order_no")] + [None]
+
+    logs = {}
+    for product_id, department_id in conn.execute("""
+        SELECT product_id, department_id FROM product_movements ORDER BY product_id, id
+    """):
+        logs.setdefault(product_id, []).append(department_id)
+
+    problems = [f"product {pid}: moved through {log}, expected {route}"
+                for pid, log in logs.items() if log != route]
+    unfinished = conn.execute("SELECT COUNT(*) FROM products WHERE status != 'Completed'").fetchone()[0]
+    if unfinished:
+        problems.append(f"{unfinished} product(s) not Completed")
+    logged = sum(len(log) for log in logs.values()) - len(logs)   # less the creation entries
+    if logged != moved:
+        problems.append(f"workers committed {moved} moves but {logged} were logged")
+    database.close_connection()
+    return problems
+
+
+@click.command()
+@click.option("--workers", default=8, show_default=True, help="Station processes.")
+@click.option("--products", default=1000, show_default=True, help="Products to push through every department.")
+@click.option("--seed", default=42, show_default=True)
+@click.option("--unchecked", is_flag=True, help="Move without the expected-department check.")
+@click.option("--min-rate", default=0.0, show_default=True,
+              help="Fail if fewer moves per second than this were committed.")
+def main(workers, products, seed, unchecked, min_rate):
+    """Run the concurrent-move stress test."""
+    from tabulate import tabulate
+
+    work = tempfile.mkdtemp(prefix="stress_moves_")
+    db = os.path.join(work, "stress.db")
+    try:
+        ids = _setup(db, products)
+        click.echo(f"Moving {len(ids)} products with {workers} stations...", err=True)
+        # Spawned, not forked, so no process inherits another's pooled connection
+        with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+            runs = list(pool.map(_station, [db] * workers, [ids] * workers,
+                                 [seed + n for n in range(workers)], [unchecked] * workers))
+
+        moved = sum(run[0] for run in runs)
+        conflicts = sum(run[1] for run in runs)
+        elapsed = max(run[3] for run in runs) - min(run[2] for run in runs)
+        rate = moved / elapsed
+        click.echo(tabulate([
+            ("moves committed", moved),
+            ("conflicts reported", conflicts),
+            ("seconds", round(elapsed, 2)),
+            ("moves/sec", round(rate)),
+        ]))
+
+        problems = verify(db, moved)
+        if problems:
+            click.echo(f"\n❌ {len(problems)} problem(s) in the movement log:")
+            for problem in problems[:20]:
+                click.echo(f"  {problem}")
+            raise SystemExit(1)
+        if rate < min_rate:
+            click.echo(f"\n❌ {rate:.0f} moves/sec is below --min-rate {min_rate:.0f}.")
+            raise SystemExit(1)
+        click.echo("\n✅ Every product moved through each department exactly once.")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()